@@ -1,28 +1,140 @@
+import json
+import time
 import network
+import binascii
 
 
 def _active(func):
     """
-    检查 WLAN 是否开启，若未开启，则开启后关闭
+    检查 WLAN 是否开启，若未开启，则开启后关闭（在 keep_active() 中调用时保持开启）
     """
     def change_active(self, *args, **kwargs):
-        if not self.active():  # wlan 不常用时尽量减小功耗
-            self.active(True)
-            result = func(self, *args, **kwargs)
-            self.active(False)
-            return result
-        else:
+        with _KeepActive(self):  # wlan 不常用时尽量减小功耗
             return func(self, *args, **kwargs)
 
     return change_active
 
 
+class _KeepActive:
+    """
+    在一批操作期间保持 WLAN 开启，只在最外层退出时关闭由其开启的 WLAN，可以嵌套使用
+    """
+
+    def __init__(self, wlan):
+        self.wlan = wlan
+
+    def __enter__(self):
+        wlan = self.wlan
+        if not getattr(wlan, "_active_depth", 0):
+            wlan._active_restore = not wlan.active()  # 退出时是否需要关闭
+            if wlan._active_restore:
+                wlan.active(True)
+            wlan._active_depth = 0
+        wlan._active_depth += 1
+        return wlan
+
+    def __exit__(self, *args):
+        wlan = self.wlan
+        wlan._active_depth -= 1
+        if not wlan._active_depth and wlan._active_restore:
+            wlan.active(False)
+
+
+class _Performance:
+    """
+    在大量传输数据期间关闭 WLAN 的省电模式（并提高发射功率），退出时恢复原来的设置，可以嵌套使用
+    """
+
+    def __init__(self, wlan, tx_power):
+        self.wlan = wlan
+        self.tx_power = tx_power
+
+    def __enter__(self):
+        wlan = self.wlan
+        depth = getattr(wlan, "_perf_depth", 0)
+        wlan._perf_depth = depth + 1
+        if depth:  # 已处于高性能模式
+            return wlan
+        wlan._perf_saved = {}
+        settings = {"pm": wlan.PM_NONE}
+        if self.tx_power:
+            settings["txpower"] = self.tx_power
+        with _KeepActive(wlan):
+            for name, value in settings.items():
+                try:
+                    wlan._perf_saved[name] = wlan.config(name)
+                    wlan.config(**{name: value})
+                except (OSError, ValueError):
+                    pass  # 固件不支持该设置
+        return wlan
+
+    def __exit__(self, *args):
+        wlan = self.wlan
+        wlan._perf_depth -= 1
+        if wlan._perf_depth:
+            return
+        with _KeepActive(wlan):
+            for name, value in wlan._perf_saved.items():
+                try:
+                    wlan.config(**{name: value})
+                except (OSError, ValueError):
+                    pass
+
+
 class Client(network.WLAN):
-    def __init__(self):
+    FAST_TIMEOUT = 3000  # 使用保存的连接参数快速重连时的最长等待时间（毫秒）
+    SCAN_TTL = 10000  # 扫描结果的缓存时间（毫秒）
+    RSSI_MARGIN = 8  # 信号强度相差不超过该值（dBm）的接入点，优先选择以往吞吐量更高的
+    ROAM_GAIN = 10  # roam() 切换接入点所需的最小信号强度提升（dBm）
+    MAX_RATES = 8  # 最多记录的接入点吞吐量数量，超过时忘记最久没有测量的接入点
+    MAX_TX_POWER = 20  # performance() 使用的发射功率（dBm）
+
+    def __init__(self, link_file: str = "/_easynetwork.json", static_ip: bool = False, networks: list = None):
+        """
+        初始化无线网络客户端
+
+        Args:
+            link_file: 保存上一次成功连接的参数（BSSID、信道、IP 配置）和各接入点吞吐量的文件，设为 None 则不保存
+            static_ip: 快速重连时是否直接使用上一次 DHCP 获取的 IP 配置，跳过 DHCP 以进一步缩短连接时间
+                （需要确保路由器不会将该地址分配给其他设备）
+            networks: 已知的无线网络 [(ssid, key), ...]，connect_wait() 不指定 ssid 时从中选择信号最好的接入点
+        """
         super().__init__(network.STA_IF)
         self.PM_NONE = 0
         self.PM_PERFORMANCE = 1
         self.PM_POWERSAVE = 2
+        self.link_file = link_file
+        self.static_ip = static_ip
+        self.networks = networks or []
+        self._link = None  # 正在连接的接入点的参数 {'ssid': str, 'bssid': hex, 'channel': int}
+        self._key = None  # 正在连接的无线网络的密码
+        self._rates = None  # 各接入点以往的吞吐量 [[bssid(hex), 字节/秒], ...]，最近测量的在最后
+        self._scan = None  # 扫描结果的缓存 (time.ticks_ms(), [...])
+
+    def keep_active(self):
+        """
+        在一批操作期间保持 WLAN 开启，避免每次调用 scan()、config()、ifconfig() 时反复开关无线网络
+
+        Example:
+            with client.keep_active():
+                nets = client.scan()
+                mac = client.config('mac')
+        """
+        return _KeepActive(self)
+
+    def performance(self, tx_power: bool = True):
+        """
+        在大量传输数据期间（例如 OTA 更新）切换到高性能模式：关闭省电模式（PM_NONE），并将发射功率设为 MAX_TX_POWER，
+        退出时恢复原来的设置
+
+        Args:
+            tx_power: 是否同时提高发射功率
+
+        Example:
+            with client.performance():
+                eo.update()
+        """
+        return _Performance(self, self.MAX_TX_POWER if tx_power else None)
 
     def connect(self, *args, **kwargs):
         """
@@ -35,19 +147,254 @@ class Client(network.WLAN):
             reconnects: 重新连接尝试次数（int, 0=无，-1=无限制）
         """
         super().active(True)
+        self._active_restore = False  # 在 keep_active() 中连接时，退出后保持开启
         super().disconnect()
         super().connect(*args, **kwargs)
 
-    @_active
-    def scan(self) -> list:
+    def connect_wait(self, timeout: int = 15000, ssid: str = None, key: str = None, **kwargs) -> bool:
+        """
+        连接无线网络并等待连接完成，等待期间休眠而不是空转
+
+        优先使用上一次成功连接时保存的 BSSID、信道（以及 IP 配置）直接重连，跳过扫描（和 DHCP）；
+        快速重连失败时，扫描一次并连接信号最好的已知接入点，连接成功后保存其参数
+
+        Args:
+            timeout: 最长等待时间（毫秒）
+            ssid: 无线网络名称，不指定则从 networks 中选择
+            key: 无线网络密码
+            **kwargs: 传递给 connect() 的其他参数，例如 reconnects
+
+        Returns:
+            True: 已连接
+            False: 连接超时
+
+        Example:
+            client.connect_wait(15000, 'ssid', 'password')
+        """
+        start = time.ticks_ms()
+        networks = [(ssid, key)] if ssid else self.networks
+        keys = dict(networks)
+        super().active(True)
+        if super().isconnected() and super().config("ssid") in keys:  # 已连接到已知的网络
+            return True
+        link = self._load_link()
+        if link and link["ssid"] in keys:  # 快速重连
+            if self.static_ip and link.get("ifconfig"):
+                super().ifconfig(tuple(link["ifconfig"]))
+            if link.get("channel"):
+                try:
+                    super().config(channel=link["channel"])
+                except (OSError, ValueError):
+                    pass  # 部分固件不支持设置客户端的信道
+            self._link = {"ssid": link["ssid"], "bssid": link["bssid"], "channel": link.get("channel")}
+            self._key = keys[link["ssid"]]
+            self.connect(link["ssid"], self._key, bssid=binascii.unhexlify(link["bssid"]), **kwargs)
+            if self._wait(start, min(timeout, self.FAST_TIMEOUT)):
+                self._save_link()
+                return True
+            print("[WARN] Fast reconnect failed, scanning for networks.")
+            if self.static_ip and link.get("ifconfig"):
+                try:
+                    super().ifconfig("dhcp")  # 恢复 DHCP
+                except (OSError, TypeError, ValueError):
+                    pass
+        # 完整连接：扫描一次并选择信号最好的已知接入点
+        ap = self.best_ap(networks)
+        if ap:
+            self._connect_ap(ap, keys[ap[0].decode()], **kwargs)
+        elif ssid:  # 未扫描到（例如隐藏的网络），由固件自行查找
+            self._link = None
+            self._key = key
+            self.connect(ssid, key, **kwargs)
+        else:
+            return False
+        if self._wait(start, timeout):
+            self._save_link()
+            return True
+        return False
+
+    def best_ap(self, networks: list = None, max_age: int = None):
+        """
+        从一次扫描的结果中选择信号最好的已知接入点：信号强度与最强者相差不超过 RSSI_MARGIN 的接入点中，
+        选择以往吞吐量最高的，吞吐量相同时选择信号最强的；尚未测量过的接入点按这些接入点吞吐量的平均值计算，
+        不会因为未测量而优先或落后
+
+        Args:
+            networks: 已知的无线网络 [(ssid, key), ...]，默认为 networks
+            max_age: 可以接受的扫描结果的最长时间（毫秒），见 scan()
+
+        Returns:
+            (ssid, bssid, channel, RSSI, security, hidden)，没有已知的接入点时返回 None
+        """
+        ssids = {n[0] for n in (networks or self.networks)}
+        aps = [ap for ap in self.scan(max_age) if ap[0].decode() in ssids]
+        if not aps:
+            return None
+        best_rssi = max(ap[3] for ap in aps)
+        rates = dict(self._load_rates())
+        candidates = [(ap, binascii.hexlify(ap[1]).decode()) for ap in aps if ap[3] >= best_rssi - self.RSSI_MARGIN]
+        measured = [rates[bssid] for ap, bssid in candidates if bssid in rates]
+        neutral = sum(measured) // len(measured) if measured else 0  # 未测量的接入点的吞吐量
+        return max(candidates, key=lambda c: (rates.get(c[1], neutral), c[0][3]))[0]
+
+    def roam(self, timeout: int = 10000) -> bool:
+        """
+        重新扫描，若已知接入点的信号比当前接入点强 ROAM_GAIN 以上，则切换到该接入点，适合在大量传输数据之前调用
+
+        Args:
+            timeout: 切换时的最长等待时间（毫秒），切换失败时重新连接原来的接入点
+
+        Returns:
+            True: 已切换
+            False: 无需切换或切换失败
+        """
+        if not super().isconnected() or not self._link:
+            return False
+        networks = self.networks or [(self._link["ssid"], self._key)]
+        keys = dict(networks)
+        aps = [ap for ap in self.scan(0) if ap[0].decode() in keys]
+        current = None
+        for ap in aps:
+            if binascii.hexlify(ap[1]).decode() == self._link["bssid"]:
+                current = ap
+        best = max(aps, key=lambda ap: ap[3]) if aps else None
+        if not best or (current and best[3] < current[3] + self.ROAM_GAIN) or best is current:
+            return False
+        old, old_key = self._link, self._key
+        start = time.ticks_ms()
+        self._connect_ap(best, keys[best[0].decode()])
+        if self._wait(start, timeout):
+            self._save_link()
+            return True
+        print("[WARN] Roaming failed, reconnecting to the previous access point.")
+        self._link, self._key = old, old_key
+        self.connect(old["ssid"], old_key, bssid=binascii.unhexlify(old["bssid"]))
+        self._wait(time.ticks_ms(), timeout)
+        return False
+
+    def record_throughput(self, size: int, ms: int):
         """
-        扫描无线网络
+        记录当前接入点的吞吐量，之后选择接入点时参考（例如在 OTA 下载完成后调用）
+
+        Args:
+            size: 传输的字节数
+            ms: 传输所用的时间（毫秒）
+        """
+        if not self._link or ms <= 0:
+            return
+        rates = self._load_rates()
+        rate = size * 1000 // ms
+        bssid = self._link["bssid"]
+        for item in rates:
+            if item[0] == bssid:
+                rates.remove(item)
+                rate = (item[1] + rate) // 2  # 与以往的结果平均
+                break
+        rates.append([bssid, rate])
+        while len(rates) > self.MAX_RATES:  # 忘记最久没有测量的接入点，与吞吐量的高低无关
+            rates.pop(0)
+        self._save_link()
+
+    def _connect_ap(self, ap: tuple, key: str, **kwargs):
+        """
+        连接扫描到的接入点
+
+        Args:
+            ap: scan() 返回的接入点
+            key: 无线网络密码
+            **kwargs: 传递给 connect() 的其他参数
+        """
+        self._link = {"ssid": ap[0].decode(), "bssid": binascii.hexlify(ap[1]).decode(), "channel": ap[2]}
+        self._key = key
+        self.connect(self._link["ssid"], key, bssid=ap[1], **kwargs)
+
+    def _wait(self, start: int, timeout: int) -> bool:
+        """
+        休眠等待连接完成
+
+        Args:
+            start: 开始时间（time.ticks_ms()）
+            timeout: 从开始时间起的最长等待时间（毫秒）
+
+        Returns:
+            True: 已连接
+            False: 连接超时
+        """
+        while time.ticks_diff(time.ticks_ms(), start) < timeout:
+            if super().isconnected():
+                return True
+            time.sleep_ms(50)
+        return super().isconnected()
+
+    def _load_link(self):
+        """
+        读取上一次成功连接的参数
+
+        Returns:
+            {'ssid': str, 'bssid': hex, 'channel': int, 'ifconfig': list, 'rates': list}，不存在时返回 None
+        """
+        if not self.link_file:
+            return None
+        try:
+            with open(self.link_file) as f:
+                link = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not link.get("ssid") or not link.get("bssid"):
+            return None
+        return link
+
+    def _load_rates(self) -> list:
+        """
+        读取各接入点以往的吞吐量
+
+        Returns:
+            [[bssid(hex), 字节/秒], ...]，最近测量的在最后
+        """
+        if self._rates is None:
+            link = self._load_link()
+            rates = link.get("rates", []) if link else []
+            if isinstance(rates, dict):  # 旧的格式 {bssid(hex): 字节/秒}
+                rates = [[bssid, rate] for bssid, rate in rates.items()]
+            self._rates = rates
+        return self._rates
+
+    def _save_link(self):
+        """
+        保存本次成功连接的参数，参数未变化时不写入，以减少闪存的写入
+        """
+        if not self.link_file or not self._link:
+            return
+        link = dict(self._link)
+        if self.static_ip:
+            link["ifconfig"] = list(super().ifconfig())
+        link["rates"] = self._load_rates()
+        if link == self._load_link():
+            return
+        try:
+            with open(self.link_file, "w") as f:
+                json.dump(link, f)
+        except OSError as e:
+            print("[WARN] Failed to save the link parameters: {}".format(e))
+
+    def scan(self, max_age: int = None) -> list:
+        """
+        扫描无线网络，max_age 毫秒内扫描过时直接返回上一次的结果
+
+        Args:
+            max_age: 可以接受的扫描结果的最长时间（毫秒），默认为 Client.SCAN_TTL，设为 0 则重新扫描
 
         Returns:
             List[Tuple[bytes, bytes, int, int, int, bool]]
             [(ssid, bssid, channel, RSSI, security, hidden), ...]
         """
-        return super().scan()
+        if max_age is None:
+            max_age = self.SCAN_TTL
+        if self._scan and time.ticks_diff(time.ticks_ms(), self._scan[0]) < max_age:
+            return self._scan[1]
+        with _KeepActive(self):  # 使用缓存时无需开启 WLAN
+            self._scan = (time.ticks_ms(), super().scan())
+        return self._scan[1]
 
     @_active
     def config(self, *args, **kwargs):
@@ -147,6 +494,12 @@ class AP(network.WLAN):
         self.PM_PERFORMANCE = 1
         self.PM_POWERSAVE = 2
 
+    def keep_active(self):
+        """
+        在一批操作期间保持 WLAN 开启，避免每次调用 config()、ifconfig() 时反复开关无线网络
+        """
+        return _KeepActive(self)
+
     @_active
     def config(self, *args, **kwargs):
         """
@@ -0,0 +1,574 @@
+"""
+EasyOTA 核心：只包含调度和提交 SHA 的快速检查，网络、哈希和安装引擎在需要时才会加载
+
+    easyota/task.py: 切换网络的高性能模式，调度后台任务
+    easyota/net.py: 请求 Git 树对象 API，下载文件，根据内存预算选择缓冲区
+    easyota/digest.py: 计算本地文件的哈希值
+    easyota/check.py: 对比本地与远程文件
+    easyota/install.py: 规划存储空间、检查点、安装更新
+    easyota/store.py: 以 Git blob SHA 为键的对象存储
+    easyota/multi.py: 在一次检查和安装中更新多个存储库
+    easyota/notify.py: 等待新版本的通知
+    easyota/firmware.py: 将固件镜像写入 OTA 分区
+"""
+import gc
+import os
+import sys
+import time
+
+
+def make_dirs(path: str):
+    """
+    逐级创建目录
+
+    Args:
+        path: 路径
+    """
+    # 分割路径为目录名列表
+    folders = path.strip("/").split("/")
+    # 逐级创建目录
+    for i in range(len(folders)):
+        folder = "/".join(folders[:i + 1])
+        if not exists(folder):
+            os.mkdir(folder)
+
+
+def exists(path: str) -> bool:
+    """
+    判断路径是否存在
+
+    Args:
+        path: 路径
+
+    Returns:
+        True：如果路径存在
+        False：如果路径不存在
+    """
+    try:
+        os.stat(path)
+        return True
+    except OSError:  # 路径不存在
+        return False
+
+
+def decode_hash(sha1_hash):
+    """
+    Hash 解码为文本
+    Args:
+        sha1_hash: SHA-1 哈希值
+    Returns:
+        解码后的文本
+    """
+    import binascii
+    return binascii.hexlify(sha1_hash).decode("utf-8")
+
+
+def run_gen(gen):
+    """
+    运行生成器直到结束（阻塞）
+
+    Args:
+        gen: 生成器
+
+    Returns:
+        生成器的返回值
+    """
+    try:
+        while True:
+            next(gen)
+    except StopIteration as e:
+        return e.args[0] if e.args else None
+
+
+class EasyOTA:
+    GITHUB_API = "https://api.github.com/repos/{user}/{repo}/git/trees/{branch}?recursive=1"
+    GITHUB_RAW = "https://raw.githubusercontent.com/{user}/{repo}/{branch}/{path}"
+    GITHUB_RAW2 = "https://raw.fastgit.org/{user}/{repo}/{branch}/{path}"
+    GITEE_API = "https://gitee.com/api/v5/repos/{user}/{repo}/git/trees/{branch}?recursive=1"
+    GITEE_RAW = "https://gitee.com/{user}/{repo}/raw/{branch}/{path}"
+    GITHUB_HEAD = "https://api.github.com/repos/{user}/{repo}/commits/{branch}"
+    GITEE_HEAD = "https://gitee.com/api/v5/repos/{user}/{repo}/branches/{branch}"
+    USER_AGENT = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/"
+                      "537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36 Edg/110.0.1587.49"
+    }
+    MAX_BLOCK_SIZE = 4096  # 文件系统块大小的上限
+    MAX_CHUNK_SIZE = 16384  # 下载（每次读取）和哈希缓冲区的最大大小
+    CHUNK_SHARE = 16  # 缓冲区最多占用内存预算的 1/CHUNK_SHARE
+    TREE_MEMORY = 65536  # 内存预算低于该值时不请求递归的树对象，改为逐级请求各个目录
+    SPACE_RESERVE = 2  # 更新后至少保留的空闲块数量
+    ROAM_SIZE = 65536  # 需要下载的数据达到该大小时，下载前调用 network.roam()（只在 fetch() 和 update() 中），设为 None 则不切换
+
+    def __init__(
+            self,
+            user: str,
+            repo: str,
+            branch: str,
+            files: list = None,
+            ignore: list = None,
+            git_raw: str = None,
+            git_api: str = None,
+            git_head: str = None,
+            local_path: str = "",
+            remote_path: str = "",
+            cache_path: str = "/_EasyOTA_Cache",
+            mpy_path: str = "_mpy",
+            callback=None,
+            headers: dict = None,
+            cached_files: bool = True,
+            network=None,
+            cache_size: int = 65536,
+            memory: int = None,
+    ):
+        """
+        初始化 EasyOTA 实例
+
+        Args:
+            user: 用户名
+            repo: 存储库
+            branch: 分支，一般为 `main` 或者 `master`
+            files: 需要检查的文件和路径，以 local_path 为标准的相对目录，默认：检查全部
+            ignore: 不需要检查的文件，以 local_path 为标准的相对目录，默认：无
+            git_raw: Git 原始文件下载地址
+            git_api: Git 文件信息 API 地址
+            git_head: 获取分支最新提交 SHA 的 API 地址，git_api 为 Github / Gitee 的 API 时默认使用对应的地址，
+                其他 git_api 默认禁用，设为 "" 则禁用：
+                最新提交与上一次成功安装的提交相同时，只需一次很小的请求即可返回无更新，否则更新时固定使用该提交的文件
+            local_path: 需要检查的本地目录
+            remote_path: 需要检查的远程 (Git) 目录
+            cache_path: EasyOTA 的数据缓存目录，其中保存检查点，设备重启后可以从检查点继续下载和安装；
+                下载并校验的文件以 Git blob SHA 为键保存在其中的对象存储中，再次检查、重试或重启后都不会重复下载
+            mpy_path: 预编译 .mpy 文件的远程目录，以 remote_path 为标准的相对目录，设为 "" 则禁用：
+                `{mpy_path}/{tag}/lib/xxx.mpy` 为 `lib/xxx.py` 的预编译版本，tag 与设备的 .mpy 版本和架构相符时，
+                安装 .mpy 文件替代 .py 文件，否则安装 .py 文件，可以使用 tools/mpy_build.py 生成
+            callback: 回调函数，用于返回检查状态和进度 Return: ("msg", done, total)，done 和 total 为整数，msg 为字符串：
+                preparation: 正在准备中
+                fetch: 正在检查更新
+                update: 正在安装更新
+            headers: requests 请求头
+            cached_files: 检查更新时，缓存更新文件
+                True：检查更新时会缓存文件在本地，检查完成后可以立刻安装更新，可以快更新的速度
+                False：检查更新时只对比哈希，更新时再下载和校验文件
+            network: 网络对象，例如 easynetwork.Client，检查和安装更新期间调用其 performance() 切换到高性能模式，
+                结束后恢复原来的设置；下载完成后调用其 record_throughput() 记录吞吐量
+            cache_size: 对象存储中当前更新不需要的对象的大小上限（字节），超过时删除最久未使用的对象
+            memory: 可以使用的内存预算（字节），默认为第一次检查或安装更新时 gc.mem_free() 的值，无法获取时使用与文件系统块大小相同的缓冲区；
+                据此选择每次下载读取和哈希缓冲区的大小（写入时仍然按文件系统块大小的整数倍写入），
+                以及一次请求整个树对象还是逐级请求各个目录（内存较小的开发板）
+
+        Notes:
+            检查更新时会根据文件大小规划存储空间：空间不足以缓存全部文件时，将逐个文件下载并安装；空间仍然不足时，拒绝更新
+            EasyOTA 虽然拥有一定的可靠性，但是您仍然需要留意正好处于两次版本切换之间进行更新的用户，可以试着将版本文件与程序分开进行更新，先更新
+            版本文件，版本文件里的更新选项设为禁用更新，2-6小时后再更新程序，将版本说明文件里的更新选项设为启用更新，以达到最佳的可靠性
+        """
+        self.local_dirs = None
+        self.local_files = None
+        self.remote_files = None
+        self.files = files or []
+        self.ignore = ignore or []
+        self.git_raw = git_raw or EasyOTA.GITHUB_RAW
+        self.git_api = git_api or EasyOTA.GITHUB_API
+        self.cache_path = cache_path.strip("/")
+        self.objects_path = "{}/objects".format(self.cache_path)  # 对象存储 {sha}
+        self._lru_file = "{}/objects.lru".format(self.cache_path)  # 对象的使用顺序
+        self._plan_file = "{}/plan.json".format(self.cache_path)  # 检查点：检查更新的结果
+        self._log_file = "{}/done.log".format(self.cache_path)  # 检查点：已校验的文件 "sha path"
+        self._head_file = "{}/HEAD".format(self.cache_path)  # 上一次成功安装的提交 "sha key"
+        self.local_path = local_path.strip("/")
+        # 缓存目录位于本地目录中时，不能被当作需要同步的文件
+        if not self.local_path:
+            self._cache_dir = self.cache_path
+        elif self.cache_path.startswith(self.local_path + "/"):
+            self._cache_dir = self.cache_path[len(self.local_path) + 1:]
+        else:
+            self._cache_dir = None
+        self.remote_path = remote_path.strip("/")
+        self.mpy_path = mpy_path.strip("/")
+        self.mpy_tags = None  # 设备可以加载的 .mpy 版本标签，见 net.mpy_tags()
+        if git_head is None:  # 只为 Github / Gitee 的 API 选择默认值，其他服务器需要手动指定
+            if self.git_api.startswith("https://api.github.com/"):
+                git_head = EasyOTA.GITHUB_HEAD
+            elif self.git_api.startswith("https://gitee.com/api/"):
+                git_head = EasyOTA.GITEE_HEAD
+            else:
+                git_head = ""
+        self.git_head = git_head.format(user=user, repo=repo, branch=branch)
+        self.git_raw_ref = self.git_raw.format(user=user, repo=repo, branch="{ref}", path=self.remote_path).strip("/")
+        self.git_raw = self.git_raw.format(user=user, repo=repo, branch=branch, path=self.remote_path).strip("/")
+        self.git_tree = self.git_api.format(user=user, repo=repo, branch="{sha}")  # 以 SHA 查询树对象的 API 地址
+        self.git_tree = self.git_tree.replace("recursive=1&", "").replace("&recursive=1", "").replace("?recursive=1", "")
+        self.git_api = self.git_api.format(user=user, repo=repo, branch=branch)
+        self.branch = branch
+        self.source = "{}/{}/{}".format(user, repo, branch)  # 来源名称，用于新版本通知，见 notify
+        self.head = None  # 分支最新提交的 SHA
+        self.ref = branch  # 下载文件时使用的分支或提交
+        self.changes = []  # 需要进行更新的文件
+        self.remote_dirs = None
+        self._trees = {}  # 已请求过的树对象 {sha: {name: (type, sha)}}
+        self.callback = callback
+        self.check_time = None  # 上一次更新检查时间
+        self.deleted_dirs = None
+        self.added_dirs = None
+        self.deleted_files = None
+        self.changed_files = None
+        self.headers = headers or self.USER_AGENT
+        self.cached_files = cached_files
+        self.network = network
+        self._network = None  # 当前任务使用的网络对象
+        self._roam = False  # 当前任务是否可以调用 network.roam()（会阻塞扫描和重连，后台任务中不调用）
+        self.transferred = [0, 0]  # 当前任务下载的字节数和所用时间（毫秒）
+        self.ignore = [i.lstrip('/') for i in self.ignore]
+        self.plan = None  # 存储空间规划 {'strategy': 'cache' / 'file', 'need': 0, 'free': 0, 'delta': 0}
+        self.replaced_size = 0
+        self.remote_blobs = None  # {path: (sha, size, 远程路径，与 path 相同时为 None)}
+        self.phase = "idle"  # 当前阶段，见 step()
+        self.result = None  # 后台任务的结果
+        self._task = None  # 后台任务（生成器）
+        self._installed = set()  # 已安装的文件 {"sha path"}
+        self._lru = None  # 对象的使用顺序（从旧到新），见 store.load_index()
+        self._peers = ()  # 共用对象的其他实例，见 multi.MultiOTA
+        self.cache_size = cache_size
+        self._key = self._config_key()
+        self.memory = memory  # 内存预算，第一次检查或安装更新时确定，见 net.plan_memory()
+        try:
+            self.block_size = min(os.statvfs(self.local_path or "/")[0], self.MAX_BLOCK_SIZE)  # 文件系统块大小
+        except OSError:
+            self.block_size = 512
+        self.chunk_size = None  # 下载（每次读取）和哈希缓冲区的大小
+        self.write_size = None  # 写入缓冲区的大小，为块大小的整数倍，不会写入不足一块的数据
+        self.tree_recursive = True  # 一次请求整个树对象（响应会被完整解析，需要较多内存）
+        self.peak_memory = None  # 检查和安装更新期间堆内存占用的峰值（字节），只在 MicroPython 中记录
+
+
+    def list_files(self, path: str, level: int = 100, _level: int = 1, relative_path: str = '') -> tuple:
+        """
+        分别列出所有文件和目录（输出相对目路径）
+
+        Args:
+            path: 起始目录
+            level: 最大文件夹层数
+            _level: 当前所在的文件夹层数（一般不需要修改）
+            relative_path: 相对路径（输出为相对当前路径的路径列表）
+
+        Returns:
+            Tuple[file_paths(list), dir_paths(list)]
+        """
+        from . import check
+        return run_gen(check.list_files(path, level, _level, relative_path))
+
+    @staticmethod
+    def download_file(url: str, file: str, headers: dict, retry: int = 3, sha: str = None, size: int = 0,
+                      block_size: int = 2048):
+        """
+        下载文件到指定路径，数据按文件系统块大小合并后写入，以减少闪存的磨损和写放大
+
+        Args:
+            url: 远程文件 URL
+            file: 文件存储在本地的路径
+            headers: User-Agent
+            retry: 最大重试次数
+            sha: 文件的 Git blob SHA-1，指定时边下载边校验，校验失败则重试
+            size: 文件大小，指定 sha 时需要
+            block_size: 写入缓冲区大小，一般为文件系统块大小
+
+        Returns:
+            True: 成功
+            None: 失败
+        """
+        from . import net
+        return run_gen(net.download(url, file, headers, retry, sha, size, block_size))
+
+    @staticmethod
+    def calculate_local_hash(file: str) -> str:
+        """
+        计算本地文件哈希值
+
+        Args:
+            file: 文件路径
+
+        Returns:
+            SHA-1 哈希值
+        """
+        from . import digest
+        return digest.local_hash(file)
+
+    @staticmethod
+    def calculate_git_hash(file: str) -> str:
+        """
+        计算本地文件的 Git blob 哈希值，可以直接与 Git 树中记录的 SHA 对比
+
+        Args:
+            file: 文件路径
+
+        Returns:
+            SHA-1 哈希值
+        """
+        from . import digest
+        return run_gen(digest.git_hash(file))
+
+    @staticmethod
+    def calculate_remote_hash(url: str, headers: dict, retry: int = 3):
+        """
+        校验远程文件（服务器端文件）的哈希
+
+        Args:
+            url: 文件链接
+            headers: requests 请求头
+            retry: 最大重试次数
+
+        Returns:
+            hex 哈希结果
+        """
+        from . import net
+        return net.remote_hash(url, headers, retry)
+
+    def _raw_url(self, path: str) -> str:
+        """
+        生成文件的下载地址，已知最新提交时固定使用该提交，避免更新过程中有新的推送导致版本混杂
+
+        Args:
+            path: 相对于 remote_path 的路径
+
+        Returns:
+            下载地址
+        """
+        return "{}/{}".format(self.git_raw_ref.format(ref=self.ref), path)
+
+    def _fetch_head(self):
+        """
+        获取分支最新提交的 SHA（生成器），只需一次很小的请求
+
+        Returns:
+            SHA，失败或已禁用时返回 None
+        """
+        if not self.git_head:
+            return None
+        import json
+        try:
+            import urequests
+        except ImportError:
+            from lib import urequests
+        response = None
+        headers = dict(self.headers)
+        headers["Accept"] = "application/vnd.github.sha"  # Github 只返回 SHA 文本
+        try:
+            response = urequests.get(self.git_head, headers=headers)
+            if response.status_code != 200:
+                raise OSError("Status Code - {}".format(response.status_code))
+            text = response.text.strip()
+        except Exception as e:
+            print("[WARN] EasyOTA: Failed to get the latest commit: {}".format(e))
+            return None
+        finally:
+            if response:
+                response.close()
+        yield
+        if text.startswith("{"):  # Gitee 等返回 JSON
+            data = json.loads(text)
+            text = data.get("sha") or data.get("commit", {}).get("sha", "")
+        return text or None
+
+    def _config_key(self) -> str:
+        """
+        生成当前配置的标识，配置变化后不会复用之前的提交记录和检查点
+
+        Returns:
+            配置的标识
+        """
+        mpy = str(getattr(sys.implementation, "_mpy", 0)) if self.mpy_path else ""  # .mpy 版本和架构
+        return "|".join((self.git_raw, self.local_path, ",".join(self.files), ",".join(self.ignore), mpy))
+
+    def _read_head(self):
+        """
+        读取上一次成功安装的提交
+
+        Returns:
+            SHA，不存在或与当前配置不符时返回 None
+        """
+        try:
+            with open(self._head_file) as f:
+                sha, key = f.read().split(" ", 1)
+        except (OSError, ValueError):
+            return None
+        return sha if key == self._key else None
+
+    def block_align(self, size: int) -> int:
+        """
+        按文件系统块大小向上取整
+
+        Args:
+            size: 字节数
+
+        Returns:
+            文件在闪存中实际占用的字节数
+        """
+        return -(-size // self.block_size) * self.block_size
+
+    def perform_callback(self, msg, done, total):
+        """
+        进度表示回调函数
+
+        Args:
+            msg: 消息
+                准备中：preparation
+                检查中：fetch
+                更新中：update
+            done: 已完成
+            total: 总计
+        """
+        if msg != self.phase:  # 阶段切换时回收内存
+            gc.collect()
+        self.phase = msg
+        self._sample_memory()
+        if self.callback:
+            try:
+                self.callback(msg, done, total)
+            except Exception as e:
+                print("[ERROR] EasyOTA: Callback Function ERROR - {}".format(e))
+
+    def _sample_memory(self):
+        """
+        记录堆内存占用的峰值
+        """
+        try:
+            used = gc.mem_alloc()
+        except AttributeError:  # 不是 MicroPython
+            return
+        if self.peak_memory is None or used > self.peak_memory:
+            self.peak_memory = used
+
+    def clear(self, objects: bool = False):
+        """
+        清理临时文件和检查点，保留上一次成功安装的提交记录
+
+        Args:
+            objects: 是否同时清空对象存储，默认保留，已下载的文件不会再次下载
+
+        Returns:
+            True：成功清理缓存文件
+            False：缓存文件不存在
+        """
+        if exists(self.cache_path):
+            for name in os.listdir(self.cache_path):
+                path = "{}/{}".format(self.cache_path, name)
+                if name == "HEAD" or (not objects and name in ("objects", "objects.lru")):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:  # 目录，需要删除时才加载安装引擎
+                    from . import install
+                    install.remove_dirs(path)
+            if objects:
+                self._lru = None  # 对象存储已删除，下次使用时重新读取
+            return True
+        else:
+            return False
+
+    def fetch(self, network=None):
+        """
+        检查是否有新版本
+
+        Args:
+            network: 网络对象，默认为初始化时指定的 network
+
+        Returns:
+            List: 有新版本 (if list)
+            List: 无新版本 (if not list)
+            None: 出现网络错误
+        """
+        from . import task
+        return run_gen(task.run(self, self._fetch(), network, (self,), True))
+
+    def _fetch(self, listing=None):
+        """
+        fetch 的生成器版本
+
+        Args:
+            listing: 列出本地文件和目录的函数（生成器），默认遍历 local_path，见 check.check_all()
+        """
+        self.check_time = None
+        head = yield from self._fetch_head()
+        if head and head == self._read_head():  # 与上一次成功安装的提交相同，无需加载引擎和检查文件
+            self.head = self.ref = head
+            self.perform_callback("fetch", 1, 1)
+            self.changes = ([], [], [], [])
+            self.check_time = time.time()
+            self.clear()
+            return self.changes
+        from . import install
+        return (yield from install.fetch_changes(self, head, listing))
+
+    def update(self, network=None):
+        """
+        检查并更新
+
+        Args:
+            network: 网络对象，默认为初始化时指定的 network
+
+        Returns:
+            Ture 成功
+            False 不需要
+            None 失败
+        """
+        from . import task
+        return run_gen(task.run(self, self._update(), network, (self,), True))
+
+    def _update(self):
+        """
+        update 的生成器版本
+        """
+        if self.check_time is None and exists(self._plan_file):  # 从检查点继续上一次的更新
+            from . import install
+            install.load_checkpoint(self)
+        if self.check_time and self.check_time + 180 >= time.time():  # 180秒内使用上次检查更新的缓存，减小再次检查所消耗的时间
+            pass
+        elif self.check_time and self.cached_files:
+            pass
+        else:
+            yield from self._fetch()
+        if self.changes is None:  # 检查更新失败
+            return None
+        if self.changes != ([], [], [], []):  # 存在不一致的文件
+            from . import install
+            return (yield from install.apply_changes(self))
+        else:
+            return False
+
+    def start(self, install: bool = True, network=None):
+        """
+        开始在后台检查（并安装）更新，之后在主循环中反复调用 step() 推进，不会长时间阻塞主循环
+
+        Args:
+            install: 检查完成后是否安装更新
+                True: 相当于 update()
+                False: 相当于 fetch()
+            network: 网络对象，默认为初始化时指定的 network
+
+        Example:
+            eo.start()
+            while eo.step(20) != "done":
+                pass  # 执行其他任务
+            print(eo.result)
+        """
+        from . import task
+        task.start(self, self._update() if install else self._fetch(), network, (self,))
+
+    def step(self, budget_ms: int = 20) -> str:
+        """
+        推进后台任务，每次调用只执行约 budget_ms 毫秒的工作（一次 API 请求、一个文件数据块、一个哈希数据块等）
+
+        Args:
+            budget_ms: 本次调用的时间预算（毫秒），至少执行一个工作单元
+
+        Returns:
+            当前阶段:
+                idle: 没有后台任务
+                preparation: 正在准备中
+                fetch: 正在检查更新
+                update: 正在安装更新
+                done: 已完成，结果见 result，与 fetch() 或 update() 的返回值相同
+        """
+        if self._task is None:
+            return self.phase
+        from . import task
+        return task.step(self, budget_ms)
@@ -0,0 +1,204 @@
+"""
+EasyOTA 检查引擎：列出本地文件，与远程 Git 树对比，只在检查更新时加载
+"""
+import os
+from . import exists
+from . import net, digest
+
+
+def get_path_type(path: str):
+    """
+    判断路径类型
+
+    Args:
+        path: 路径
+
+    Returns:
+        'dir': 如果路径是目录
+        'file': 如果路径是文件
+    """
+    try:
+        result = os.stat(path)  # 获取路径的信息
+        return "dir" if result[0] & 0o170000 == 0o040000 else "file"  # 如果是目录返回'dir'，如果是文件返回'file'
+    except OSError:  # 路径不存在或无法访问
+        return None
+
+
+def is_dir(path: str) -> bool:
+    """
+    判断路径是否为文件夹
+
+    Args:
+        path: 路径
+
+    Returns:
+        True or False
+    """
+    return get_path_type(path) == "dir"
+
+
+def is_file(path: str) -> bool:
+    """
+    判断路径是否为文件
+
+    Args:
+        path: 路径
+
+    Returns:
+        True or False
+    """
+    return get_path_type(path) == "file"
+
+
+def lstrip(string: str, chars: str):
+    """
+    清除字符串左边的指定字符（完全匹配）
+
+    Args:
+        string: 原始文本
+        chars: 要清除的字符
+
+    Returns:
+        处理后的文本
+    """
+    chars_len = len(chars)
+    if string[:chars_len] == chars:
+        string = string[chars_len:]
+    return string
+
+
+def list_files(path: str, level: int = 100, _level: int = 1, relative_path: str = ''):
+    """
+    EasyOTA.list_files 的生成器版本，每列出一个目录让出一次
+
+    Returns:
+        Tuple[file_paths(list), dir_paths(list)]
+    """
+    files = []  # 文件列表
+    dirs = []  # 目录列表
+    local_path = "{}/".format(relative_path.strip("/"))
+    if not exists(path):
+        print('[ERROR] EasyOTA: local_path "{}" not exists.'.format(path))
+    items = os.listdir(path)
+    for item in items:
+        _path = "{}/{}".format(path, item)
+        if is_dir(_path):
+            dirs.append(lstrip(_path, local_path))
+            if _level <= level:
+                files_list, dirs_list = yield from list_files(_path, level, _level + 1, relative_path)
+                files.extend(files_list)
+                dirs.extend(dirs_list)
+        elif is_file(_path):
+            files.append(lstrip(_path, local_path))
+    yield
+    return files, dirs
+
+
+def check_all(ota, listing=None):
+    """
+    检查全部文件的一致性（生成器）
+    Args:
+        ota: EasyOTA 实例
+        listing: 列出本地文件和目录的函数 listing(ota)（生成器），返回 Tuple[file_paths(list), dir_paths(list)]，
+            路径为相对于 local_path 的路径，默认遍历 local_path
+
+    Returns:
+        一个包含下列四个列表的元组:
+            - changed_files: 需要更改的文件 [{'path':'/xxx/xx', 'sha1': 'Git blob SHA-1', 'size': 0}]，
+              安装预编译文件时还包含远程路径 'src'，内容与某个本地文件相同时还包含该文件的路径 'local'
+            - deleted_files: 需要删除的文件路径列表
+            - added_dirs: 需要添加的目录路径列表
+            - deleted_dirs: 需要删除的目录路径列表
+    """
+    # 确定需要进行更新的目录和文件 #
+    ota.local_files = set()
+    ota.local_dirs = set()
+    ota.perform_callback("preparation", 20, 100)
+    if ota.files:  # 指定文件和路径
+        for f in ota.files:
+            f = f.strip("/")
+            if f:  # 过滤空路径（过滤根目录）
+                path = "{}/{}".format(ota.local_path, f).strip("/")
+                if not net.ignored(ota, f):  # 检查文件是否为忽略的路径内
+                    if is_file(path):
+                        ota.local_files.add(f)  # 添加到要同步的文件
+                    elif is_dir(path):
+                        ota.local_dirs.add(f)  # 添加到要同步的目录
+
+    else:  # 所有文件和路径
+        if listing:  # 使用共用的遍历结果
+            files, dirs = yield from listing(ota)
+        else:  # 列出本地所有文件和目录
+            files, dirs = yield from list_files(ota.local_path, relative_path=ota.local_path)
+        for f in files:
+            f = f.strip("/")
+            if not net.ignored(ota, f):
+                ota.local_files.add(f)  # 添加到要同步的文件
+        ota.perform_callback("preparation", 40, 100)
+        for d in dirs:
+            d = d.strip("/")
+            if not net.ignored(ota, d):  # 文件夹不被忽略且不属于被忽略的目录内
+                ota.local_dirs.add(d)
+
+    # Git 仓库已有且需要同步的目录和文件 #
+    ota.perform_callback("preparation", 60, 100)
+    if (yield from net.fetch_tree(ota)) is None:  # 获取远程文件列表失败
+        return None
+
+    ota.perform_callback("preparation", 80, 100)
+
+    if ota.files:  # 若指定需要更新的文件范围，则进行计算
+        files_set = set()
+        for f in ota.files:
+            f = f.strip("/")
+            files_set.add(f)
+            if f.endswith(".py"):  # 源文件可能被预编译文件替代
+                files_set.add(f[:-3] + ".mpy")
+        ota.local_files &= files_set
+        ota.remote_files &= files_set
+        ota.remote_dirs &= files_set
+        ota.local_dirs &= files_set
+    ota.deleted_files = list(ota.local_files - ota.remote_files)  # 需要删除的文件
+    ota.added_dirs = list(ota.remote_dirs - ota.local_dirs)  # 需要增加的文件夹
+    kept = ota.ignore + [ota._cache_dir] if ota._cache_dir else ota.ignore  # 其中的文件夹不能被删除
+    ota.deleted_dirs = [d for d in ota.local_dirs - ota.remote_dirs  # 需要删除的文件夹，包含被忽略的路径或缓存目录的文件夹除外
+                        if not any(i.startswith(d + "/") for i in kept)]
+    ota.changed_files = []  # 需要修改的文件 [{'path':'/xxx/xx', 'sha1': 'xxxxx', 'size': 0}]
+    # 检查远程与本地文件一致性，只需对比本地文件与 Git 树中记录的哈希，无需下载文件 #
+    ota.perform_callback("preparation", 100, 100)
+    total_files = len(ota.remote_files) + len(ota.deleted_files)  # 需要计算哈希的文件数量
+    done_files = 0
+    ota.replaced_size = 0  # 将被替换的本地文件的总大小
+    local_hashes = {}  # 可以复用的本地文件 {sha: path}，优先使用将被删除的文件（可以直接移动）
+    for f in ota.deleted_files:
+        ota.perform_callback("fetch", done_files, total_files)
+        done_files += 1
+        local_hashes[(yield from digest.git_hash("{}/{}".format(ota.local_path, f), ota.chunk_size))] = f
+    for f in ota.remote_files:  # 这里的 f 为相对路径，使用时按需转换为绝对路径
+        sha, size, src = ota.remote_blobs[f]
+        local_file = "{}/{}".format(ota.local_path, f)  # 文件的本地绝对路径
+        ota.perform_callback("fetch", done_files, total_files)
+        done_files += 1
+        if exists(local_file):
+            local_sha = yield from digest.git_hash(local_file, ota.chunk_size)
+            if local_sha not in local_hashes:
+                local_hashes[local_sha] = f
+            if local_sha == sha:
+                continue
+            ota.replaced_size += ota.block_align(os.stat(local_file)[6])
+        change = {"path": f, "sha1": sha, "size": size}
+        if src:  # 远程路径与本地路径不同（预编译文件）
+            change["src"] = src
+        ota.changed_files.append(change)
+    # 内容已存在于本地的文件（移动、重命名或复制的文件）无需下载，安装时复用本地文件 #
+    for change in ota.changed_files:
+        if change["sha1"] in local_hashes:
+            change["local"] = local_hashes[change["sha1"]]
+    total_files = total_files if total_files else 1  # total_file 不为 0
+    ota.perform_callback("fetch", total_files, total_files)  # 检查完成
+    return (
+        ota.changed_files,  # 修改的文件
+        ota.deleted_files,  # 删除的文件
+        ota.added_dirs,  # 添加的目录
+        ota.deleted_dirs,  # 删除的目录
+    )
@@ -0,0 +1,48 @@
+"""
+EasyOTA 哈希引擎：计算本地文件的哈希值，只在对比文件时加载
+"""
+import os
+import hashlib
+from . import decode_hash
+
+
+def local_hash(file: str) -> str:
+    """
+    计算本地文件哈希值
+
+    Args:
+        file: 文件路径
+
+    Returns:
+        SHA-1 哈希值
+    """
+    with open(file, "rb") as f:
+        _hash = hashlib.sha1()
+        data = f.read(2048)
+        while data:
+            _hash.update(data)
+            data = f.read(2048)
+    return decode_hash(_hash.digest())
+
+
+def git_hash(file: str, chunk_size: int = 2048):
+    """
+    EasyOTA.calculate_git_hash 的生成器版本，每计算一个数据块让出一次
+
+    Args:
+        file: 文件路径
+        chunk_size: 缓冲区大小，见 EasyOTA.chunk_size
+
+    Returns:
+        SHA-1 哈希值
+    """
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    with open(file, "rb") as f:
+        _hash = hashlib.sha1("blob {}\0".format(os.stat(file)[6]).encode())
+        n = f.readinto(buf)
+        while n:
+            _hash.update(mv[:n])
+            yield
+            n = f.readinto(buf)
+    return decode_hash(_hash.digest())
@@ -0,0 +1,209 @@
+"""
+EasyOTA 固件更新：将存储库中的固件镜像（.bin）边下载边写入 OTA 分区，逐块计算 Git blob SHA-1，校验通过后设为启动分区，
+不会在内存或文件系统中缓存整个镜像，只在更新固件时加载
+
+镜像需要是写入应用分区的固件（例如 ESP-IDF 构建生成的 micropython.bin），而不是从地址 0 开始烧录、包含引导程序和分区表的完整镜像；
+新固件启动后需要调用 esp32.Partition.mark_app_valid_cancel_rollback()，否则启用回滚的引导程序会在下次复位时回滚到原来的固件
+
+Example:
+    from lib.easyota.firmware import update_firmware
+
+    result = update_firmware(eo, "firmware/ESP32_GENERIC_C3.bin")
+    if result is True:
+        machine.reset()
+"""
+import hashlib
+from . import decode_hash, run_gen
+from . import net, task
+
+
+class FileBlockDevice:
+    def __init__(self, file: str, block_count: int, block_size: int = 4096):
+        """
+        以文件模拟的块设备，提供与 esp32.Partition 相同的接口，用于在电脑或没有 OTA 分区的设备上测试
+
+        Args:
+            file: 保存数据的文件，不存在时创建并以 0xFF 填充
+            block_count: 块的数量
+            block_size: 块的大小（字节）
+        """
+        self.file = file
+        self.block_count = block_count
+        self.block_size = block_size
+        self.boot = False  # 是否已设为启动分区
+        try:
+            open(file, "rb").close()
+        except OSError:
+            blank = b"\xff" * block_size
+            with open(file, "wb") as f:
+                for _ in range(block_count):
+                    f.write(blank)
+
+    def readblocks(self, block_num: int, buf, offset: int = 0):
+        with open(self.file, "rb") as f:
+            f.seek(block_num * self.block_size + offset)
+            f.readinto(buf)
+
+    def writeblocks(self, block_num: int, buf, offset: int = 0):
+        if (block_num * self.block_size + offset + len(buf)) > self.block_count * self.block_size:
+            raise OSError("Write beyond the end of the device")
+        with open(self.file, "r+b") as f:
+            f.seek(block_num * self.block_size + offset)
+            f.write(buf)
+
+    def ioctl(self, op: int, arg: int):
+        if op == 4:  # 块的数量
+            return self.block_count
+        if op == 5:  # 块的大小
+            return self.block_size
+        return 0
+
+    def set_boot(self):
+        self.boot = True
+
+
+class BlockWriter:
+    def __init__(self, device, block_size: int):
+        """
+        将数据按块写入块设备，最后不足一块的数据以 0xFF 填充，见 net.stream()
+
+        Args:
+            device: 块设备（esp32.Partition 或 FileBlockDevice）
+            block_size: 块的大小（字节）
+        """
+        self.device = device
+        self.block_size = block_size
+        self.block = 0  # 下一个写入的块
+
+    def __enter__(self):
+        self.block = 0  # 每次重试都从头写入
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def write(self, buf):
+        n = len(buf)
+        if n < self.block_size:  # 最后一块
+            block = bytearray(b"\xff" * self.block_size)
+            block[:n] = buf
+            buf = block
+        self.device.writeblocks(self.block, buf)
+        self.block += 1
+
+
+def next_partition():
+    """
+    获取下一个 OTA 分区（需要 esp32 模块和带有 OTA 分区的分区表）
+
+    Returns:
+        esp32.Partition
+    """
+    import esp32
+    return esp32.Partition(esp32.Partition.RUNNING).get_next_update()
+
+
+def running_hash(sha: str, size: int, running, block_size: int):
+    """
+    计算正在运行的分区中前 size 字节的 Git blob SHA-1，判断该固件是否已经在运行（生成器）
+
+    Args:
+        sha: 固件镜像的 Git blob SHA-1
+        size: 固件镜像的大小
+        running: 正在运行的分区
+        block_size: 块的大小
+
+    Returns:
+        True or False
+    """
+    if running.ioctl(4, 0) * block_size < size:
+        return False
+    _hash = hashlib.sha1("blob {}\0".format(size).encode())
+    buf = bytearray(block_size)
+    block = 0
+    while size > 0:
+        running.readblocks(block, buf)
+        _hash.update(buf if size >= block_size else memoryview(buf)[:size])
+        size -= block_size
+        block += 1
+        yield
+    return decode_hash(_hash.digest()) == sha
+
+
+def update_firmware(ota, path: str, partition=None, running=None, network=None):
+    """
+    下载固件镜像并直接写入 OTA 分区，校验通过后设为启动分区，复位后生效
+
+    Args:
+        ota: EasyOTA 实例，使用其存储库、remote_path、请求头等设置
+        path: 固件镜像在存储库中的路径，以 remote_path 为标准的相对路径
+        partition: 写入的分区，默认为下一个 OTA 分区；可以使用 FileBlockDevice 进行测试
+        running: 正在运行的分区，其中已经是该固件时不会更新，默认只在 partition 为默认值时使用当前运行的分区
+        network: 网络对象，默认为 EasyOTA 实例的 network
+
+    Returns:
+        True: 已写入并设为启动分区
+        False: 该固件已经在运行，无需更新
+        None: 更新失败
+    """
+    return run_gen(task.run(ota, update(ota, path, partition, running), network, (ota,)))
+
+
+def update(ota, path: str, partition=None, running=None):
+    """
+    下载固件镜像并写入 OTA 分区，校验通过后设为启动分区（生成器）
+
+    Args:
+        ota: EasyOTA 实例
+        path: 固件镜像在存储库中的路径，以 remote_path 为标准的相对路径
+        partition: 写入的分区，默认为下一个 OTA 分区
+        running: 正在运行的分区，用于跳过已经在运行的固件，默认只在 partition 为默认值时使用当前运行的分区
+
+    Returns:
+        True: 已写入并设为启动分区，复位后生效
+        False: 该固件已经在运行，无需更新
+        None: 更新失败
+    """
+    import time
+    net.plan_memory(ota)
+    if partition is None:
+        import esp32
+        partition = next_partition()
+        if running is None:
+            running = esp32.Partition(esp32.Partition.RUNNING)
+    ota.perform_callback("update", 0, 1)
+    head = yield from ota._fetch_head()
+    ref = ota.ref  # 不影响尚未安装的文件更新
+    ota.ref = head or ota.branch  # 固定在同一个提交，避免下载过程中有新的推送
+    ota._trees = {}
+    try:
+        node = yield from net.resolve_path(ota, "{}/{}".format(ota.remote_path, path.strip("/")))
+        url = ota._raw_url(path.strip("/"))
+    finally:
+        ota.ref = ref
+        ota._trees = {}
+    if node is None:
+        return None
+    _type, sha, size = node
+    if _type != "blob":
+        print('[ERROR] EasyOTA: Firmware "{}" not exists.'.format(path))
+        return None
+    block_size = partition.ioctl(5, 0)
+    if partition.ioctl(4, 0) * block_size < size:
+        print("[ERROR] EasyOTA: Firmware is too large, {} bytes needed, {} bytes available.".format(
+            size, partition.ioctl(4, 0) * block_size))
+        return None
+    if running is not None and (yield from running_hash(sha, size, running, block_size)):
+        ota.perform_callback("update", 1, 1)
+        return False
+    start = time.ticks_ms()
+    result = yield from net.stream(url, lambda: BlockWriter(partition, block_size), ota.headers, sha=sha, size=size,
+                                   block_size=block_size, read_size=ota.chunk_size)
+    if not result:
+        print("[ERROR] EasyOTA: Firmware Update Failed!")
+        return None
+    ota.transferred[0] += size
+    ota.transferred[1] += time.ticks_diff(time.ticks_ms(), start)
+    partition.set_boot()
+    ota.perform_callback("update", 1, 1)
+    return True
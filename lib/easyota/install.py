@@ -0,0 +1,480 @@
+"""
+EasyOTA 安装引擎：规划存储空间，读写检查点，下载并安装更新，只在有更新时加载
+"""
+import os
+import json
+import time
+from . import make_dirs, exists
+from . import check, net, digest, store
+from .check import is_dir
+
+
+def remove_dirs(path: str):
+    """
+    逐级删除目录
+
+    Args:
+        path: 目录路径
+    """
+    for file in os.listdir(path):
+        file_path = "{}/{}".format(path, file)
+        if is_dir(file_path):
+            remove_dirs(file_path)  # 递归删除子目录
+        else:
+            os.remove(file_path)  # 删除文件
+    os.rmdir(path)  # 删除目录本身
+
+
+def fetch_changes(ota, head, listing=None):
+    """
+    检查全部文件的一致性，规划存储空间并保存检查点，使用缓存策略时同时下载文件（生成器），见 EasyOTA._fetch()
+
+    Args:
+        ota: EasyOTA 实例
+        head: 远程分支最新的提交，获取失败时为 None
+        listing: 列出本地文件和目录的函数，见 check.check_all()
+
+    Returns:
+        与 EasyOTA.fetch() 相同
+    """
+    load_checkpoint(ota)  # 复用上一次已下载并校验的文件
+    ota.check_time = None
+    ota.head = head
+    ota.ref = head or ota.branch
+    ota.changes = yield from check.check_all(ota, listing)
+    if ota.changes is None:
+        print("[ERROR] EasyOTA: Failed to fetch updates.")
+        return None
+    if ota.changes == ([], [], [], []):
+        ota.check_time = time.time()
+        ota.clear()
+        write_head(ota)  # 本地文件与该提交一致
+        return ota.changes
+    # 规划存储空间，保存检查点，检查更新时缓存文件
+    ota.plan = None
+    if ota.changed_files and plan_space(ota) is None:
+        ota.changes = None
+        return None
+    ota.check_time = time.time()
+    save_checkpoint(ota)
+    if ota.cached_files and ota.plan and ota.plan["strategy"] == "cache":
+        if (yield from download_changes(ota, "fetch")) is None:
+            print("[ERROR] EasyOTA: Failed to fetch updates.")
+            ota.check_time = None
+            return None
+    return ota.changes
+
+
+def apply_changes(ota):
+    """
+    按规划的策略下载并安装已检查到的更新（生成器），见 EasyOTA._update()
+
+    Args:
+        ota: EasyOTA 实例
+
+    Returns:
+        True 成功
+        None 失败
+    """
+    files_num = len(ota.changed_files)  # 修改的文件数量
+    files_num = files_num if files_num else 1  # 文件数量不为 0
+    if ota.plan and ota.plan["strategy"] == "file":  # 存储空间不足，逐个文件下载并安装
+        result = yield from update_each(ota, files_num)
+    else:
+        result = yield from download_changes(ota, "update")  # 下载尚未缓存的文件到对象存储
+        if result:
+            # -- 对文件进行更改中，不要断电 -- #
+            result = yield from install_changes(ota, files_num)
+            # -- 对文件进行更改中，不要断电 -- #
+    if result is None:
+        return None
+    finish_update(ota, files_num)
+    return True
+
+
+def finish_update(ota, files_num: int):
+    """
+    安装完成后清理检查点和多余的对象，并记录成功安装的提交
+
+    Args:
+        ota: EasyOTA 实例
+        files_num: 修改的文件数量
+    """
+    ota.perform_callback("update", files_num, files_num)  # 更新完成
+    ota.clear()  # 清理检查点
+    store.evict(ota)
+    write_head(ota)
+    ota.changes = ([], [], [], [])  # 已安装，再次调用 update() 时无需安装
+
+
+def write_head(ota):
+    """
+    记录成功安装的提交
+
+    Args:
+        ota: EasyOTA 实例
+    """
+    if ota.head:
+        make_dirs(ota.cache_path)
+        with open(ota._head_file, "w") as f:
+            f.write("{} {}".format(ota.head, ota._key))
+
+
+def plan_space(ota):
+    """
+    根据 Git 树中记录的文件大小和 os.statvfs 规划更新所需的存储空间，并选择更新策略:
+        cache: 所有文件先下载到对象存储，最后统一安装（默认，断电安全）
+        file: 空间不足以缓存全部文件时，逐个文件下载并立即安装
+
+    Args:
+        ota: EasyOTA 实例
+
+    Returns:
+        True: 空间足够
+        None: 空间不足，拒绝更新
+    """
+    stat = os.statvfs(ota.local_path or "/")
+    free = stat[1] * stat[4]  # f_frsize * f_bavail
+    reserve = ota.block_size * ota.SPACE_RESERVE
+    need = 0  # 缓存全部文件所需空间，已在存储中的对象不需要再次下载，移动的本地文件不需要额外的空间
+    needed = set()
+    moved = set()  # 移动到新位置的被删除的文件
+    for f in ota.changed_files:
+        if f["sha1"] not in needed and not store.has(ota, f["sha1"]):
+            if f.get("local") in ota.deleted_files:
+                moved.add(f["local"])
+            else:
+                need += ota.block_align(f["size"])
+        needed.add(f["sha1"])
+    if need + reserve > free:  # 空间不足时，先删除当前更新不需要的对象
+        free += store.evict(ota, needed, 0)
+    deleted = 0  # 删除的文件所释放的空间
+    for f in ota.deleted_files:
+        if f not in moved:
+            deleted += ota.block_align(os.stat("{}/{}".format(ota.local_path, f))[6])
+    ota.plan = {
+        "strategy": "cache",
+        "need": need,
+        "free": free,
+        "delta": need - ota.replaced_size - deleted,  # 安装后存储空间占用的净变化
+    }
+    if need + reserve <= free:
+        return True
+    # 逐个文件安装：先删除文件，再按占用增长从小到大的顺序替换文件，模拟每一步的剩余空间
+    ota.plan["strategy"] = "file"
+    free += deleted
+    changes = []
+    for f in ota.changed_files:
+        local_file = "{}/{}".format(ota.local_path, f["path"])
+        old = ota.block_align(os.stat(local_file)[6]) if exists(local_file) else 0
+        changes.append((ota.block_align(f["size"]) - old, f))
+    changes.sort(key=lambda c: (c[0], -c[1]["size"]))
+    ota.plan["need"] = 0
+    for delta, f in changes:
+        size = ota.block_align(f["size"])
+        ota.plan["need"] = max(ota.plan["need"], size)
+        if size + reserve > free:
+            print("[ERROR] EasyOTA: Not enough space for update, {} bytes needed, {} bytes free.".format(
+                size + reserve, free))
+            return None
+        free -= delta
+    ota.changed_files[:] = [c[1] for c in changes]  # 原地排序，ota.changes 和检查点使用同一个列表
+    print("[WARN] EasyOTA: Not enough space to cache all files, files will be installed one by one.")
+    return True
+
+
+def download_changes(ota, msg: str):
+    """
+    下载并校验需要修改的文件到对象存储（生成器），存储中已有的对象不会再次下载，内容与本地文件相同的文件不会下载
+
+    Args:
+        ota: EasyOTA 实例
+        msg: 回调函数的进度消息
+
+    Returns:
+        True: 成功
+        None: 失败
+    """
+    total = len(ota.changed_files)
+    roam(ota)
+    for index, f in enumerate(ota.changed_files):
+        ota.perform_callback(msg, index, total)
+        if "{} {}".format(f["sha1"], f["path"]) in ota._installed or store.has(ota, f["sha1"]) or "local" in f:
+            continue  # 已安装、已下载或在安装时复用本地文件
+        peer = store.find_peer(ota, f["sha1"])
+        if peer:  # 其他来源已下载相同的文件（MultiOTA）
+            yield from store.put(ota, f["sha1"], store.object_path(peer, f["sha1"]))
+            continue
+        if (yield from download(ota, f)) is None:
+            print("[ERROR] EasyOTA: Update Failed!")
+            return None
+    return True
+
+
+def download(ota, f: dict):
+    """
+    下载并校验单个文件到对象存储（生成器），同时统计传输的字节数和时间
+
+    Args:
+        ota: EasyOTA 实例
+        f: changed_files 中的文件信息
+
+    Returns:
+        True: 成功
+        None: 失败
+    """
+    start = time.ticks_ms()
+    make_dirs(ota.objects_path)
+    file = "{}.tmp".format(store.object_path(ota, f["sha1"]))  # 校验通过后才加入存储
+    result = yield from net.download(ota._raw_url(f.get("src", f["path"])), file, ota.headers, sha=f["sha1"],
+                                     size=f["size"], block_size=ota.write_size, read_size=ota.chunk_size)
+    if result:
+        store.add(ota, f["sha1"], file)
+        ota.transferred[0] += f["size"]
+        ota.transferred[1] += time.ticks_diff(time.ticks_ms(), start)
+    elif exists(file):
+        os.remove(file)
+    return result
+
+
+def reuse_local(ota, copy: bool = True):
+    """
+    将内容相同的本地文件放入对象存储以代替下载（生成器）：先复制仍然需要的文件，再移动将被删除的文件，
+    复用前重新校验本地文件，文件已变化时改为下载
+
+    Args:
+        ota: EasyOTA 实例
+        copy: 是否复制仍然需要的文件，否则只移动将被删除的文件
+
+    Returns:
+        True: 成功
+        None: 失败
+    """
+    deleted = set(ota.deleted_files)
+    sources = {}  # {sha: 本地文件}
+    for f in ota.changed_files:
+        if "local" in f and "{} {}".format(f["sha1"], f["path"]) not in ota._installed:
+            sources[f["sha1"]] = f["local"]
+    for move in (False, True):  # 先复制，再移动，保证复制时源文件仍然存在
+        for sha, path in sources.items():
+            if (path in deleted) != move or (not move and not copy) or store.has(ota, sha):
+                continue
+            file = "{}/{}".format(ota.local_path, path)
+            if exists(file) and (yield from digest.git_hash(file, ota.chunk_size)) == sha:
+                yield from store.put(ota, sha, file, move)
+                continue
+            print("[WARN] EasyOTA: Local file {} has changed, downloading instead.".format(path))
+            for f in ota.changed_files:
+                if f["sha1"] == sha and (yield from download(ota, f)) is None:
+                    return None
+    return True
+
+
+def install_changes(ota, files_num: int):
+    """
+    将对象存储中的文件安装到目标位置（生成器）：复用本地文件，创建新增的目录，删除需要删除的文件和目录，然后逐个重命名对象，
+    多个文件使用相同的对象时，其余文件先复制对象的副本，最后只执行重命名
+
+    Args:
+        ota: EasyOTA 实例
+        files_num: 修改的文件数量
+
+    Returns:
+        True 成功
+        None 失败（对象缺失）
+    """
+    if (yield from reuse_local(ota)) is None:
+        return None
+    pending = [f for f in ota.changed_files if "{} {}".format(f["sha1"], f["path"]) not in ota._installed]
+    for f in pending:
+        if not store.has(ota, f["sha1"]):
+            print("[ERROR] EasyOTA: Object {} of {} is missing.".format(f["sha1"], f["path"]))
+            return None
+    yield from remove_deleted(ota)
+    uses = {}
+    for f in pending:
+        uses[f["sha1"]] = uses.get(f["sha1"], 0) + 1
+    staged = []  # [(副本, 文件信息)]，最后一个使用该对象的文件没有副本，直接重命名对象
+    for index, f in enumerate(pending):  # 先复制需要副本的对象，每写入一个数据块让出一次
+        uses[f["sha1"]] -= 1
+        copy = (yield from store.stage(ota, f["sha1"], index)) if uses[f["sha1"]] > 0 else None
+        staged.append((copy, f))
+    # -- 只执行重命名，不会让出 -- #
+    for copy, f in staged:
+        store.take(ota, f["sha1"], "{}/{}".format(ota.local_path, f["path"]), copy)
+        mark_installed(ota, "{} {}".format(f["sha1"], f["path"]))
+    return True
+
+
+def pending_size(ota, align: bool = False) -> int:
+    """
+    计算还需要下载的数据量，已安装、已在存储中和复用本地文件的文件不计算在内
+
+    Args:
+        ota: EasyOTA 实例
+        align: 按文件系统块大小对齐，计算占用的存储空间
+
+    Returns:
+        字节数
+    """
+    size = 0
+    for f in ota.changed_files:
+        if "{} {}".format(f["sha1"], f["path"]) not in ota._installed and not store.has(ota, f["sha1"]) \
+                and "local" not in f:
+            size += ota.block_align(f["size"]) if align else f["size"]
+    return size
+
+
+def roam(ota):
+    """
+    需要下载的数据较多时，先让网络切换到信号更强的接入点；network.roam() 会阻塞扫描和重连，
+    只在阻塞的 fetch() / update() 中调用，start() / step() 的后台任务中跳过
+
+    Args:
+        ota: EasyOTA 实例
+    """
+    network = ota._network
+    if not ota._roam or network is None or ota.ROAM_SIZE is None or not hasattr(network, "roam"):
+        return
+    if pending_size(ota) >= ota.ROAM_SIZE:
+        network.roam()
+
+
+def load_checkpoint(ota):
+    """
+    读取检查点，恢复上一次检查更新的结果和安装进度，检查点与当前配置不符时清理检查点（保留对象存储）；
+    每次检查和安装更新都从这里开始，同时根据内存预算选择缓冲区的大小，见 net.plan_memory()
+
+    Args:
+        ota: EasyOTA 实例
+
+    Returns:
+        True: 成功
+        False: 检查点不存在或无效
+    """
+    net.plan_memory(ota)
+    ota._installed = set()
+    try:
+        with open(ota._plan_file) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = None
+    if not data or data.get("key") != ota._key:
+        ota.clear()
+        return False
+    try:
+        with open(ota._log_file) as f:
+            for line in f:
+                ota._installed.add(line.strip())
+    except OSError:
+        pass
+    ota.changes = tuple(data["changes"])
+    ota.changed_files, ota.deleted_files, ota.added_dirs, ota.deleted_dirs = ota.changes
+    ota.plan = data["plan"]
+    ota.check_time = data["time"]
+    ota.head = data.get("head")
+    ota.ref = ota.head or ota.branch
+    return True
+
+
+def save_checkpoint(ota):
+    """
+    保存检查点，只保留仍然需要的安装记录，将需要的对象标记为最近使用，并按 cache_size 淘汰其他对象
+
+    Args:
+        ota: EasyOTA 实例
+    """
+    paths = {f["path"]: f["sha1"] for f in ota.changed_files}
+    installed = set()
+    for entry in ota._installed:
+        sha, path = entry.split(" ", 1)
+        if paths.get(path) == sha:
+            installed.add(entry)
+    ota._installed = installed
+    needed = set(paths.values())
+    store.touch(ota, needed)
+    store.evict(ota, needed)
+    make_dirs(ota.cache_path)
+    with open(ota._plan_file, "w") as f:
+        json.dump({"key": ota._key, "time": ota.check_time, "head": ota.head, "plan": ota.plan,
+                   "changes": ota.changes}, f)
+    with open(ota._log_file, "w") as f:
+        for entry in ota._installed:
+            f.write("{}\n".format(entry))
+
+
+def mark_installed(ota, entry: str):
+    """
+    记录已安装的文件（追加写入，减少闪存写入量）
+
+    Args:
+        ota: EasyOTA 实例
+        entry: "sha path"
+    """
+    ota._installed.add(entry)
+    with open(ota._log_file, "a") as f:
+        f.write("{}\n".format(entry))
+
+
+def remove_deleted(ota):
+    """
+    创建新增的目录，删除需要删除的文件和目录（生成器），每删除一个文件或目录让出一次
+
+    Args:
+        ota: EasyOTA 实例
+    """
+    # 创建新文件夹
+    for _dir in ota.added_dirs:
+        dir_path = "{}/{}".format(ota.local_path, _dir)
+        if not exists(dir_path):  # 创建文件夹
+            make_dirs(dir_path)
+    # 删除文件
+    for del_file in ota.deleted_files:
+        path = "{}/{}".format(ota.local_path, del_file)
+        if exists(path):
+            os.remove(path)
+            yield
+    # 删除文件夹
+    for del_dir in ota.deleted_dirs:
+        path = "{}/{}".format(ota.local_path, del_dir)
+        if exists(path):
+            remove_dirs(path)
+            yield
+
+
+def update_each(ota, files_num: int):
+    """
+    逐个文件下载、校验并立即安装（生成器），只需缓存单个文件的空间，但更新过程中断电可能导致程序不完整
+
+    Args:
+        ota: EasyOTA 实例
+        files_num: 修改的文件数量
+
+    Returns:
+        True 成功
+        None 失败
+    """
+    if (yield from reuse_local(ota, False)) is None:  # 先移动将被删除的本地文件，其余的本地文件在安装时复制
+        return None
+    yield from remove_deleted(ota)  # 先删除文件，释放存储空间
+    roam(ota)
+    uses = {}
+    for f in ota.changed_files:
+        uses[f["sha1"]] = uses.get(f["sha1"], 0) + 1
+    for index, f in enumerate(ota.changed_files):
+        ota.perform_callback("update", index, files_num)
+        entry = "{} {}".format(f["sha1"], f["path"])
+        uses[f["sha1"]] -= 1
+        if entry in ota._installed:  # 已安装
+            continue
+        if not store.has(ota, f["sha1"]):
+            file = "{}/{}".format(ota.local_path, f.get("local"))
+            if "local" in f and exists(file) and (yield from digest.git_hash(file, ota.chunk_size)) == f["sha1"]:
+                yield from store.put(ota, f["sha1"], file, False)
+            elif (yield from download(ota, f)) is None:
+                print("[ERROR] EasyOTA: Update Failed!")
+                return None
+        staged = (yield from store.stage(ota, f["sha1"], 0)) if uses[f["sha1"]] > 0 else None
+        store.take(ota, f["sha1"], "{}/{}".format(ota.local_path, f["path"]), staged)
+        mark_installed(ota, entry)
+    return True
@@ -0,0 +1,205 @@
+"""
+EasyOTA 多源更新：在一次检查和一次安装中更新多个存储库（例如程序、共用的驱动和配置），
+所有来源共用一次本地文件遍历和一个下载队列，全部下载并校验后才统一安装，只在使用 MultiOTA 时加载
+
+Example:
+    from lib.easyota import EasyOTA
+    from lib.easyota.multi import MultiOTA
+
+    app = EasyOTA('user', 'app', 'main', ignore=['/lib/easyota'], cache_path='/_EasyOTA_Cache/app')
+    drivers = EasyOTA('user', 'drivers', 'main', local_path='/lib/drivers', cache_path='/_EasyOTA_Cache/drivers')
+    mo = MultiOTA([app, drivers], network=client)
+    result = mo.update()
+"""
+import os
+import time
+from . import EasyOTA, run_gen, exists
+from . import check, install, task
+
+
+class MultiOTA:
+    def __init__(self, sources: list, network=None):
+        """
+        初始化多源更新
+
+        Args:
+            sources: EasyOTA 实例列表，每个实例对应一个来源，分别指定 local_path、remote_path、ignore 等参数；
+                各个来源的 local_path 和 cache_path 都不能相同
+            network: 网络对象，见 EasyOTA
+
+        Notes:
+            一个来源的 local_path 或 cache_path 位于另一个来源的 local_path 中时，外层的来源会忽略该目录，不会将其当作需要删除的文件
+        """
+        for attr in ("local_path", "cache_path"):
+            paths = [getattr(ota, attr) for ota in sources]
+            if len(set(paths)) != len(paths):
+                raise ValueError("EasyOTA sources must use different {}".format(attr))
+        self.sources = sources
+        self.network = network
+        self._network = None  # 当前任务使用的网络对象
+        self._roam = False  # 当前任务是否可以调用 network.roam()，见 EasyOTA
+        self._walk = None  # 共用的本地文件遍历结果 (root, files, dirs)
+        self.phase = "idle"  # 当前阶段，见 step()
+        self.result = None  # 后台任务的结果
+        self._task = None  # 后台任务（生成器）
+        for ota in sources:  # 忽略嵌套在本地目录中的其他来源
+            ota._peers = [other for other in sources if other is not ota]
+            for other in sources:
+                if other is ota:
+                    continue
+                for path in (other.local_path, other.cache_path):
+                    if not ota.local_path:
+                        rel = path
+                    elif path.startswith(ota.local_path + "/"):
+                        rel = path[len(ota.local_path) + 1:]
+                    else:
+                        continue
+                    if rel and rel not in ota.ignore:
+                        ota.ignore.append(rel)
+            ota._key = ota._config_key()  # ignore 已变化
+
+    def _listing(self, ota):
+        """
+        列出来源的本地文件和目录（生成器），所有来源共用一次遍历，见 check.check_all()
+
+        Args:
+            ota: EasyOTA 实例
+
+        Returns:
+            Tuple[file_paths(list), dir_paths(list)]，相对于来源的 local_path
+        """
+        if self._walk is None:  # 从所有来源的公共上级目录开始遍历一次
+            parts = [ota.local_path.split("/") if ota.local_path else [] for ota in self.sources if not ota.files]
+            common = []
+            for names in zip(*parts):
+                if names.count(names[0]) != len(names):
+                    break
+                common.append(names[0])
+            root = "/".join(common)
+            files, dirs = yield from check.list_files(root, relative_path=root)
+            self._walk = (root, [f.strip("/") for f in files], [d.strip("/") for d in dirs])
+        root, files, dirs = self._walk
+        prefix = ota.local_path[len(root):].strip("/")
+        if not prefix:
+            return files, dirs
+        prefix += "/"
+        n = len(prefix)
+        return [f[n:] for f in files if f.startswith(prefix)], [d[n:] for d in dirs if d.startswith(prefix)]
+
+    def fetch(self, network=None):
+        """
+        检查所有来源的更新
+
+        Args:
+            network: 网络对象，默认为初始化时指定的 network
+
+        Returns:
+            [source_result, ...]: 每个来源的检查结果，与 EasyOTA.fetch() 的返回值相同
+            None: 检查失败
+        """
+        return run_gen(task.run(self, self._fetch(), network, self.sources, True))
+
+    def _fetch(self):
+        """
+        fetch 的生成器版本
+        """
+        self.phase = "fetch"
+        self._walk = None
+        results = []
+        for ota in self.sources:
+            result = yield from ota._fetch(self._listing)
+            if result is None:
+                return None
+            results.append(result)
+        self._walk = None  # 释放内存
+        return results
+
+    def update(self, network=None):
+        """
+        检查并安装所有来源的更新：所有来源需要的文件都下载并校验后才开始安装，任一来源失败时不安装任何来源
+
+        Args:
+            network: 网络对象，默认为初始化时指定的 network
+
+        Returns:
+            True: 更新成功
+            False: 无需更新
+            None: 更新失败
+        """
+        return run_gen(task.run(self, self._update(), network, self.sources, True))
+
+    def _update(self):
+        """
+        update 的生成器版本
+        """
+        self.phase = "fetch"
+        self._walk = None
+        for ota in self.sources:  # 与 EasyOTA._update() 相同，优先使用检查点和缓存的检查结果
+            if ota.check_time is None and exists(ota._plan_file):
+                install.load_checkpoint(ota)
+            if ota.check_time and (ota.check_time + 180 >= time.time() or ota.cached_files):
+                continue
+            if (yield from ota._fetch(self._listing)) is None:
+                return None
+        self._walk = None
+        pending = [ota for ota in self.sources if ota.changes != ([], [], [], [])]
+        if not pending:
+            return False
+        for ota in pending:
+            if ota.changes is None:  # 检查更新失败
+                return None
+            if ota.plan and ota.plan["strategy"] == "file":
+                print("[ERROR] EasyOTA: Not enough space to cache all sources, no source was updated.")
+                return None
+        # 所有来源共用存储空间，需要同时缓存全部来源的文件
+        stat = os.statvfs(pending[0].local_path or "/")
+        free = stat[1] * stat[4]
+        need = 0
+        for ota in pending:
+            need += install.pending_size(ota, True)
+        need += pending[0].block_size * EasyOTA.SPACE_RESERVE
+        if need > free:
+            print("[ERROR] EasyOTA: Not enough space for update, {} bytes needed, {} bytes free.".format(need, free))
+            return None
+        # 一个下载队列：依次下载所有来源的文件，其他来源的存储中已有的对象直接复制，见 store.find_peer()
+        self.phase = "update"
+        network = self._network
+        if self._roam and network is not None and EasyOTA.ROAM_SIZE is not None and hasattr(network, "roam") and \
+                sum(install.pending_size(ota) for ota in pending) >= EasyOTA.ROAM_SIZE:
+            network.roam()
+        for ota in pending:
+            if not (yield from install.download_changes(ota, "update")):
+                return None
+        # -- 对文件进行更改中，不要断电 -- #
+        for ota in pending:
+            files_num = len(ota.changed_files) or 1
+            if (yield from install.install_changes(ota, files_num)) is None:
+                return None
+        # -- 对文件进行更改中，不要断电 -- #
+        for ota in pending:
+            install.finish_update(ota, len(ota.changed_files) or 1)
+        return True
+
+    def start(self, install: bool = True, network=None):
+        """
+        开始在后台检查（并安装）所有来源的更新，之后在主循环中反复调用 step() 推进，见 EasyOTA.start()
+
+        Args:
+            install: 检查完成后是否安装更新
+                True: 相当于 update()
+                False: 相当于 fetch()
+            network: 网络对象，默认为初始化时指定的 network
+        """
+        task.start(self, self._update() if install else self._fetch(), network, self.sources)
+
+    def step(self, budget_ms: int = 20) -> str:
+        """
+        推进后台任务，每次调用只执行约 budget_ms 毫秒的工作，见 EasyOTA.step()
+
+        Args:
+            budget_ms: 本次调用的时间预算（毫秒），至少执行一个工作单元
+
+        Returns:
+            当前阶段: idle / preparation / fetch / update / done
+        """
+        return task.step(self, budget_ms)
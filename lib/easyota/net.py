@@ -0,0 +1,432 @@
+"""
+EasyOTA 网络引擎：请求 Git 树对象 API，下载和校验远程文件，根据内存预算选择缓冲区，只在检查或安装更新时加载
+"""
+import gc
+import sys
+import time
+import hashlib
+from . import make_dirs, decode_hash
+
+try:
+    import urequests
+except ImportError:
+    from lib import urequests
+
+
+MPY_ARCHS = (None, "x86", "x64", "armv6", "armv6m", "armv7m", "armv7em", "armv7emsp", "armv7emdp",
+             "xtensa", "xtensawin", "rv32imc", "rv64imc")  # sys.implementation._mpy 中的架构编号
+
+
+def mpy_tags() -> list:
+    """
+    根据 sys.implementation._mpy 获取设备可以加载的 .mpy 版本标签
+
+    Returns:
+        按优先级排序的标签，例如 ['6.2-xtensawin', '6.2']，前者可以包含原生代码，后者只包含字节码；设备不支持 .mpy 时返回 []
+    """
+    mpy = getattr(sys.implementation, "_mpy", 0)
+    if not mpy:
+        return []
+    tag = "{}.{}".format(mpy & 0xff, mpy >> 8 & 3)
+    arch = mpy >> 10
+    if 0 < arch < len(MPY_ARCHS):
+        return ["{}-{}".format(tag, MPY_ARCHS[arch]), tag]
+    return [tag]
+
+
+def plan_memory(ota):
+    """
+    根据内存预算选择下载、哈希和写入缓冲区的大小，以及一次请求整个树对象还是逐级请求各个目录，
+    只在第一次检查或安装更新时执行
+
+    Args:
+        ota: EasyOTA 实例
+    """
+    if ota.chunk_size is not None:
+        return
+    if ota.memory is None:
+        gc.collect()
+        try:
+            ota.memory = gc.mem_free()
+        except AttributeError:  # 不是 MicroPython
+            pass
+    ota.chunk_size = ota.block_size
+    if ota.memory:
+        limit = min(ota.memory // ota.CHUNK_SHARE, ota.MAX_CHUNK_SIZE)
+        chunk = 512
+        while chunk * 2 <= limit:
+            chunk *= 2
+        ota.chunk_size = chunk
+        ota.tree_recursive = ota.memory >= ota.TREE_MEMORY
+    ota.write_size = ota.block_align(ota.chunk_size)
+
+
+def sleep_gen(ms: int):
+    """
+    不阻塞的等待（生成器），等待期间不断让出
+
+    Args:
+        ms: 等待时间（毫秒）
+    """
+    deadline = time.ticks_add(time.ticks_ms(), ms)
+    while time.ticks_diff(deadline, time.ticks_ms()) > 0:
+        yield
+
+
+def tree_url(ota, sha: str, recursive: bool = False) -> str:
+    """
+    生成树对象的 API 地址
+
+    Args:
+        ota: EasyOTA 实例
+        sha: 树对象的 SHA，或者分支名
+        recursive: 是否递归列出所有子目录
+
+    Returns:
+        API 地址
+    """
+    url = ota.git_tree.format(sha=sha)
+    if recursive:
+        url = "{}{}recursive=1".format(url, "&" if "?" in url else "?")
+    return url
+
+
+def request_json(ota, url: str, retry: int = 2):
+    """
+    请求 API 并解析 JSON（生成器），每次请求后让出一次
+
+    Args:
+        ota: EasyOTA 实例
+        url: API 地址
+        retry: 最大尝试次数
+
+    Returns:
+        解析后的数据，失败时返回 None
+    """
+    num = 0
+    while num < retry:
+        response = None
+        try:
+            response = urequests.get(url, headers=ota.headers)
+            if response.status_code == 200:
+                data = response.json()
+                ota._sample_memory()  # 解析完整的 JSON 时内存占用最多
+                yield
+                return data
+            raise OSError("Status Code - {}".format(response.status_code))
+        except Exception as e:
+            num += 1
+            print("[WARN] EasyOTA: API request failed: {}".format(e))
+        finally:
+            if response:
+                response.close()
+        yield from sleep_gen(1000)
+    return None
+
+
+def read_tree(ota, sha: str):
+    """
+    列出树对象的直接子项（不递归，生成器），结果会被缓存
+
+    Args:
+        ota: EasyOTA 实例
+        sha: 树对象的 SHA，或者分支名
+
+    Returns:
+        {name: (type, sha, size)}，失败时返回 None
+    """
+    if sha not in ota._trees:
+        data = yield from request_json(ota, tree_url(ota, sha))
+        if data is None:
+            return None
+        ota._trees[sha] = {f["path"]: (f["type"], f["sha"], f.get("size", 0)) for f in data["tree"]}
+    return ota._trees[sha]
+
+
+def resolve_path(ota, path: str):
+    """
+    逐级解析存储库中的路径，获取其类型和 SHA（生成器）
+
+    Args:
+        ota: EasyOTA 实例
+        path: 存储库中的路径
+
+    Returns:
+        (type, sha, size)，路径不存在时 type 为 None，网络错误时返回 None
+    """
+    node = ("tree", ota.ref, 0)
+    for name in path.strip("/").split("/"):
+        if not name:
+            continue
+        if node[0] != "tree":
+            return None, None, 0
+        tree = yield from read_tree(ota, node[1])
+        if tree is None:
+            return None
+        node = tree.get(name, (None, None, 0))
+    return node
+
+
+def list_tree(ota, sha: str):
+    """
+    列出树对象下的所有文件和目录，内存预算较小或响应被截断时改为逐级遍历，每次只解析一个目录（生成器）
+
+    Args:
+        ota: EasyOTA 实例
+        sha: 树对象的 SHA
+
+    Returns:
+        [(path, type, sha, size), ...]，path 为相对于该树的路径，失败时返回 None
+    """
+    if ota.tree_recursive:
+        data = yield from request_json(ota, tree_url(ota, sha, True))
+        if data is None:
+            return None
+        if not data.get("truncated"):
+            return [(f["path"], f["type"], f["sha"], f.get("size", 0)) for f in data["tree"]]
+        del data  # 响应被截断，释放内存后逐级遍历
+        print("[WARN] EasyOTA: Tree truncated, listing directories one by one.")
+    entries = []
+    pending = [(sha, "")]
+    while pending:
+        sha, prefix = pending.pop()
+        tree = yield from read_tree(ota, sha)
+        if tree is None:
+            return None
+        del ota._trees[sha]  # 逐级遍历的目录不会被再次使用
+        for name, (_type, _sha, size) in tree.items():
+            path = "{}/{}".format(prefix, name).strip("/")
+            entries.append((path, _type, _sha, size))
+            if _type == "tree" and wanted_tree(ota, path):  # 不进入不需要的目录
+                pending.append((_sha, path))
+    return entries
+
+
+def ignored(ota, path: str) -> bool:
+    """
+    判断路径是否属于被忽略的文件或目录
+
+    Args:
+        ota: EasyOTA 实例
+        path: 相对路径
+
+    Returns:
+        True or False
+    """
+    for i in ota.ignore:
+        if path.startswith(i):
+            return True
+    if ota._cache_dir and (path == ota._cache_dir or path.startswith(ota._cache_dir + "/")):
+        return True
+    if path.endswith(".mpy"):  # 忽略源文件时，同时忽略其预编译文件
+        return ignored(ota, path[:-4] + ".py")
+    return False
+
+
+def wanted_tree(ota, path: str) -> bool:
+    """
+    判断遍历远程目录时是否需要进入该目录：不进入被忽略的目录，以及与设备不符的 .mpy 版本目录
+
+    Args:
+        ota: EasyOTA 实例
+        path: 相对于 remote_path 的目录路径
+
+    Returns:
+        True or False
+    """
+    if ota.mpy_path and path.startswith(ota.mpy_path + "/"):
+        return path[len(ota.mpy_path) + 1:].split("/")[0] in ota.mpy_tags
+    return not ignored(ota, path)
+
+
+def fetch_tree(ota):
+    """
+    获取需要同步的远程文件和目录，只请求 remote_path 或 files 所在的子树，而不是整个存储库（生成器）
+
+    Args:
+        ota: EasyOTA 实例
+
+    Returns:
+        True: 成功
+        None: 失败
+    """
+    ota.remote_files = set()
+    ota.remote_dirs = set()
+    ota.remote_blobs = {}
+    ota._trees = {}
+    if ota.mpy_tags is None:
+        ota.mpy_tags = mpy_tags() if ota.mpy_path else []
+    root = yield from resolve_path(ota, ota.remote_path)
+    if root is None:
+        return None
+    if root[0] != "tree":
+        print('[ERROR] EasyOTA: remote_path "{}" not exists.'.format(ota.remote_path))
+        return None
+    if ota.files:  # 指定文件和路径，只需请求其所在目录
+        entries = []
+        for f in ota.files:
+            f = f.strip("/")
+            if f:
+                node = yield from resolve_path(ota, "{}/{}".format(ota.remote_path, f))
+                if node is None:
+                    return None
+                entries.append((f, node[0], node[1], node[2]))
+                if node[0] != "blob" or not f.endswith(".py"):
+                    continue
+                for tag in ota.mpy_tags:  # 查找预编译文件
+                    path = "{}/{}/{}.mpy".format(ota.mpy_path, tag, f[:-3])
+                    node = yield from resolve_path(ota, "{}/{}".format(ota.remote_path, path))
+                    if node is None:
+                        return None
+                    entries.append((path, node[0], node[1], node[2]))
+    else:  # 所有文件和路径，只请求 remote_path 所在的子树
+        entries = yield from list_tree(ota, root[1])
+        if entries is None:
+            return None
+    ota._trees = {}
+    variants = {}  # 与设备相符的预编译文件 {源文件路径: (优先级, sha, size)}
+    mpy_prefix = "{}/".format(ota.mpy_path)
+    for path, _type, sha, size in entries:
+        if ota.mpy_path and (path == ota.mpy_path or path.startswith(mpy_prefix)):
+            parts = path[len(mpy_prefix):].split("/", 1)
+            if _type == "blob" and len(parts) == 2 and parts[0] in ota.mpy_tags and parts[1].endswith(".mpy"):
+                src = parts[1][:-4] + ".py"
+                rank = ota.mpy_tags.index(parts[0])
+                if src not in variants or rank < variants[src][0]:
+                    variants[src] = (rank, sha, size)
+            continue  # 预编译文件目录本身不需要同步
+        if ignored(ota, path):
+            continue
+        if _type == "blob":  # 是文件，且不属于被忽略的文件夹内
+            ota.remote_files.add(path)
+            ota.remote_blobs[path] = (sha, size, None)
+        elif _type == "tree":  # 是目录，且不被忽略
+            ota.remote_dirs.add(path)
+        else:
+            pass  # 路径类型不支持，或不需要更新
+    for src, (rank, sha, size) in variants.items():  # 使用预编译文件替代源文件
+        if src in ota.remote_files:
+            ota.remote_files.remove(src)
+            del ota.remote_blobs[src]
+            path = src[:-3] + ".mpy"
+            ota.remote_files.add(path)
+            ota.remote_blobs[path] = (sha, size, "{}/{}/{}".format(ota.mpy_path, ota.mpy_tags[rank], path))
+    return True
+
+
+def download(url: str, file: str, headers: dict, retry: int = 3, sha: str = None, size: int = 0,
+             block_size: int = 2048, read_size: int = None):
+    """
+    EasyOTA.download_file 的生成器版本，每写入一个数据块让出一次
+
+    Returns:
+        True: 成功
+        None: 失败
+    """
+    def sink():
+        # 路径不存在则自动创建
+        path = "/".join(file.split("/")[:-1])
+        if path.rstrip("/"):
+            make_dirs(path)
+        return open(file, "wb")
+
+    return (yield from stream(url, sink, headers, retry, sha, size, block_size, read_size))
+
+
+def stream(url: str, sink, headers: dict, retry: int = 3, sha: str = None, size: int = 0, block_size: int = 2048,
+           read_size: int = None):
+    """
+    下载数据并逐块写入（生成器），每写入一个数据块让出一次，同时计算 Git blob SHA-1，不会在内存中缓存整个文件
+
+    Args:
+        url: 下载地址
+        sink: 每次尝试时调用 sink() 获取写入的对象，该对象需要支持 with 语句和 write(buf)；
+            除最后一块外，每次写入的数据都正好为 block_size 字节
+        headers: 请求头
+        retry: 最大重试次数
+        sha: Git blob SHA-1，为 None 时不校验
+        size: 文件大小，校验时需要
+        block_size: 数据块大小（写入缓冲区的大小）
+        read_size: 每次从网络读取的最大字节数，默认为 block_size
+
+    Returns:
+        True: 成功
+        None: 失败
+    """
+    num = 0
+    response = None
+    buf = bytearray(block_size)
+    mv = memoryview(buf)
+    read_size = min(read_size or block_size, block_size)
+    while num <= retry:
+        try:
+            response = urequests.get(url, headers=headers, stream=True)
+            if response.status_code != 200:
+                raise Exception("Status Code - {}".format(response.status_code))
+            _hash = None
+            if sha:
+                _hash = hashlib.sha1("blob {}\0".format(size).encode())
+            # 缓冲区写满一个块后再写入
+            with sink() as f:
+                pos = 0
+                while True:
+                    n = response.raw.readinto(mv[pos:pos + read_size])
+                    if not n:
+                        break
+                    pos += n
+                    if pos == block_size:
+                        f.write(buf)
+                        if _hash:
+                            _hash.update(buf)
+                        pos = 0
+                    yield
+                if pos:
+                    f.write(mv[:pos])
+                    if _hash:
+                        _hash.update(mv[:pos])
+            if _hash and decode_hash(_hash.digest()) != sha:
+                raise Exception("File verification failed")
+            return True
+        except Exception as e:
+            print("[WARN] EasyOTA: File Download Failed: {}".format(e))
+            num += 1
+        finally:
+            if response:
+                response.close()
+                response = None
+    return None
+
+
+def remote_hash(url: str, headers: dict, retry: int = 3):
+    """
+    校验远程文件（服务器端文件）的哈希
+
+    Args:
+        url: 文件链接
+        headers: requests 请求头
+        retry: 最大重试次数
+
+    Returns:
+        hex 哈希结果
+    """
+    num = 0
+    response = None
+    while num <= retry:
+        try:
+            _hash = hashlib.sha1()
+            response = urequests.get(url, headers=headers, stream=True)
+            if response.status_code != 200:
+                raise Exception("Status Code - {}".format(response.status_code))
+            data = response.raw.read(2048)
+            # 下载文件
+            while data:
+                _hash.update(data)
+                data = response.raw.read(2048)
+            return decode_hash(_hash.digest())
+        except Exception as e:
+            print("[WARN] EasyOTA: File to Verify Remote File Hash: {}".format(e))
+            num += 1
+        finally:
+            if response:
+                response.close()
+    return None
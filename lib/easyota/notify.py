@@ -0,0 +1,151 @@
+"""
+EasyOTA 新版本通知：设备在两次检查之间廉价地等待新版本的通知，收到通知后才检查更新，只在使用通知时加载
+
+    UDP: 服务器在分支有新的提交时向局域网广播 "easyota {user}/{repo}/{branch} {sha}"，设备只需监听端口（非阻塞）
+    长轮询: 设备请求 {url}?sources={user}/{repo}/{branch}@{sha},...&wait={秒}，
+        服务器在其中任一来源有新的提交或超时后返回 {"{user}/{repo}/{branch}": "{sha}", ...}
+
+通知只用于触发检查，检查时仍然从 Git 服务器获取最新的提交，伪造的通知最多导致一次多余的检查。
+设备离线时会错过广播，建议在启动时和较长的间隔（例如每天）仍然检查一次更新。
+参考服务器：tools/notify_server.py
+
+Example:
+    from lib.easyota.notify import UDPListener
+
+    listener = UDPListener()
+    while True:
+        if listener.poll(eo):  # 收到新版本的通知
+            eo.start()
+        eo.step(20)
+        # 执行其他任务
+"""
+try:
+    import socket
+except ImportError:
+    import usocket as socket
+
+PORT = 42042  # 默认的 UDP 端口
+
+
+def is_new(ota, sha: str) -> bool:
+    """
+    通知中的提交是否为尚未检查或安装的新版本
+
+    Args:
+        ota: EasyOTA 实例
+        sha: 通知中的提交 SHA
+
+    Returns:
+        True or False
+    """
+    return bool(sha) and sha != ota.head and sha != ota._read_head()
+
+
+def _sources(sources) -> list:
+    """
+    将单个 EasyOTA 实例或 MultiOTA 转换为实例列表
+
+    Args:
+        sources: EasyOTA 实例、实例列表或 MultiOTA 实例
+
+    Returns:
+        [EasyOTA, ...]
+    """
+    if hasattr(sources, "sources"):  # MultiOTA
+        return sources.sources
+    if isinstance(sources, (list, tuple)):
+        return sources
+    return [sources]
+
+
+class UDPListener:
+    def __init__(self, port: int = PORT):
+        """
+        监听局域网中的新版本广播（非阻塞）
+
+        Args:
+            port: UDP 端口
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(socket.getaddrinfo("0.0.0.0", port)[0][-1])
+        self.sock.setblocking(False)
+
+    def poll(self, sources) -> list:
+        """
+        读取已收到的所有通知，不会阻塞
+
+        Args:
+            sources: EasyOTA 实例、实例列表或 MultiOTA 实例
+
+        Returns:
+            有新版本的 EasyOTA 实例列表，没有时为空列表
+        """
+        sources = _sources(sources)
+        found = []
+        while True:
+            try:
+                data = self.sock.recv(256)
+            except OSError:  # 没有更多的数据
+                break
+            try:
+                magic, source, sha = data.decode().split()
+            except (UnicodeError, ValueError):
+                continue
+            if magic != "easyota":
+                continue
+            for ota in sources:
+                if ota.source == source and ota not in found and is_new(ota, sha):
+                    found.append(ota)
+        return found
+
+    def close(self):
+        """
+        关闭监听
+        """
+        self.sock.close()
+
+
+class LongPoll:
+    def __init__(self, url: str, wait: int = 60, headers: dict = None):
+        """
+        通过 HTTP 长轮询等待新版本的通知
+
+        Args:
+            url: 通知服务器的地址，例如 "http://192.168.1.2:8042/head"
+            wait: 服务器最长的等待时间（秒），请求会阻塞这么长的时间
+            headers: 请求头
+        """
+        self.url = url
+        self.wait = wait
+        self.headers = headers or {}
+
+    def poll(self, sources) -> list:
+        """
+        等待任一来源有新的提交，最多阻塞 wait 秒；请求失败时立即返回
+
+        Args:
+            sources: EasyOTA 实例、实例列表或 MultiOTA 实例
+
+        Returns:
+            有新版本的 EasyOTA 实例列表，没有时为空列表
+        """
+        try:
+            import urequests
+        except ImportError:
+            from lib import urequests
+        sources = _sources(sources)
+        query = ",".join("{}@{}".format(ota.source, ota.head or ota._read_head() or "") for ota in sources)
+        response = None
+        try:
+            response = urequests.get("{}?sources={}&wait={}".format(self.url, query, self.wait),
+                                     headers=self.headers)
+            if response.status_code != 200:
+                raise OSError("Status Code - {}".format(response.status_code))
+            heads = response.json()
+        except Exception as e:
+            print("[WARN] EasyOTA: Failed to wait for notifications: {}".format(e))
+            return []
+        finally:
+            if response:
+                response.close()
+        return [ota for ota in sources if is_new(ota, heads.get(ota.source))]
@@ -0,0 +1,265 @@
+"""
+EasyOTA 对象存储：以 Git blob SHA 为键保存已下载并校验的文件，按最近使用的顺序淘汰，只在下载和安装时加载
+
+    {cache_path}/objects/{sha}: 已校验的文件，下载过程中写入 {sha}.tmp，校验通过后才重命名
+    {cache_path}/objects.lru: 对象的使用顺序，每行一个 SHA，越靠后越新
+"""
+import os
+from . import make_dirs, exists
+
+
+def object_path(ota, sha: str) -> str:
+    """
+    获取对象的路径
+
+    Args:
+        ota: EasyOTA 实例
+        sha: Git blob SHA-1
+
+    Returns:
+        对象的路径
+    """
+    return "{}/{}".format(ota.objects_path, sha)
+
+
+def has(ota, sha: str) -> bool:
+    """
+    对象是否已下载并校验
+
+    Args:
+        ota: EasyOTA 实例
+        sha: Git blob SHA-1
+
+    Returns:
+        True or False
+    """
+    return exists(object_path(ota, sha))
+
+
+def find_peer(ota, sha: str):
+    """
+    在共用对象的其他实例（MultiOTA 中的其他来源）的存储中查找对象
+
+    Args:
+        ota: EasyOTA 实例
+        sha: Git blob SHA-1
+
+    Returns:
+        存储中有该对象的实例，没有时返回 None
+    """
+    for peer in ota._peers:
+        if has(peer, sha):
+            return peer
+    return None
+
+
+def list_objects(ota) -> list:
+    """
+    列出存储中的所有对象
+
+    Args:
+        ota: EasyOTA 实例
+
+    Returns:
+        [sha, ...]
+    """
+    if not exists(ota.objects_path):
+        return []
+    return [name for name in os.listdir(ota.objects_path) if len(name) == 40]
+
+
+def load_index(ota) -> list:
+    """
+    读取对象的使用顺序，结果会被缓存；没有记录的对象视为最旧的对象
+
+    Args:
+        ota: EasyOTA 实例
+
+    Returns:
+        [sha, ...]，从旧到新
+    """
+    if ota._lru is None:
+        objects = set(list_objects(ota))
+        order = []
+        try:
+            with open(ota._lru_file) as f:
+                for line in f:
+                    order.append(line.strip())
+        except OSError:
+            pass
+        known = set(order)
+        lru = []
+        seen = set()
+        for sha in reversed(order):  # 重复的记录只保留最新的一条
+            if sha in objects and sha not in seen:
+                seen.add(sha)
+                lru.append(sha)
+        lru.reverse()
+        ota._lru = [sha for sha in objects if sha not in known] + lru
+    return ota._lru
+
+
+def save_index(ota):
+    """
+    保存对象的使用顺序
+
+    Args:
+        ota: EasyOTA 实例
+    """
+    make_dirs(ota.cache_path)
+    with open(ota._lru_file, "w") as f:
+        for sha in load_index(ota):
+            f.write("{}\n".format(sha))
+
+
+def add(ota, sha: str, file: str):
+    """
+    将已校验的文件加入存储（追加记录使用顺序，减少闪存写入量）
+
+    Args:
+        ota: EasyOTA 实例
+        sha: Git blob SHA-1
+        file: 已校验的文件
+    """
+    os.rename(file, object_path(ota, sha))
+    lru = load_index(ota)
+    if sha in lru:
+        lru.remove(sha)
+    lru.append(sha)
+    with open(ota._lru_file, "a") as f:
+        f.write("{}\n".format(sha))
+
+
+def touch(ota, shas):
+    """
+    将对象标记为最近使用
+
+    Args:
+        ota: EasyOTA 实例
+        shas: 对象的 SHA 集合
+    """
+    lru = load_index(ota)
+    used = [sha for sha in lru if sha in shas]
+    if not used or lru[-len(used):] == used:  # 顺序没有变化时不写入
+        return
+    ota._lru = [sha for sha in lru if sha not in shas] + used
+    save_index(ota)
+
+
+def evict(ota, keep=(), limit: int = None) -> int:
+    """
+    从最旧的对象开始删除，直到存储占用的空间不超过 limit，同时删除下载被中断的临时文件
+
+    Args:
+        ota: EasyOTA 实例
+        keep: 不能删除的对象的 SHA 集合（当前更新需要的对象）
+        limit: 存储的大小上限（字节），默认为 cache_size
+
+    Returns:
+        释放的空间（字节）
+    """
+    if limit is None:
+        limit = ota.cache_size
+    if exists(ota.objects_path):
+        for name in os.listdir(ota.objects_path):
+            if name.endswith(".tmp"):  # 下载被中断的文件
+                os.remove("{}/{}".format(ota.objects_path, name))
+    lru = load_index(ota)
+    sizes = {}
+    for sha in list(lru):
+        try:
+            sizes[sha] = ota.block_align(os.stat(object_path(ota, sha))[6])
+        except OSError:  # 对象已被删除（例如 clear(objects=True)）
+            lru.remove(sha)
+    total = sum(sizes.values())
+    freed = 0
+    for sha in list(lru):
+        if total <= limit:
+            break
+        if sha in keep:
+            continue
+        os.remove(object_path(ota, sha))
+        lru.remove(sha)
+        total -= sizes[sha]
+        freed += sizes[sha]
+    if freed:
+        save_index(ota)
+    return freed
+
+
+def put(ota, sha: str, file: str, move: bool = False):
+    """
+    将已校验的本地文件放入存储（生成器），复制时每写入一个数据块让出一次
+
+    Args:
+        ota: EasyOTA 实例
+        sha: Git blob SHA-1
+        file: 本地文件
+        move: 移动文件（文件将被删除），否则复制文件
+    """
+    make_dirs(ota.objects_path)
+    if move:
+        add(ota, sha, file)
+        return
+    tmp = "{}.tmp".format(object_path(ota, sha))
+    yield from copy_file(file, tmp, ota.write_size)
+    add(ota, sha, tmp)
+
+
+def stage(ota, sha: str, index: int):
+    """
+    将对象复制为临时文件（生成器），用于多个文件使用相同的对象时安装，每写入一个数据块让出一次，
+    中断时留下的副本与下载被中断的文件一样在 evict() 时删除
+
+    Args:
+        ota: EasyOTA 实例
+        sha: Git blob SHA-1
+        index: 副本的编号
+
+    Returns:
+        临时文件的路径
+    """
+    tmp = "{}.{}.tmp".format(object_path(ota, sha), index)
+    yield from copy_file(object_path(ota, sha), tmp, ota.write_size)
+    return tmp
+
+
+def take(ota, sha: str, file: str, staged: str = None):
+    """
+    将对象重命名到指定路径（不占用额外空间）
+
+    Args:
+        ota: EasyOTA 实例
+        sha: Git blob SHA-1
+        file: 目标路径
+        staged: stage() 生成的副本，指定时重命名副本，对象仍然保留在存储中
+    """
+    path = "/".join(file.split("/")[:-1])
+    if path:
+        make_dirs(path)
+    if staged:
+        os.rename(staged, file)
+        return
+    os.rename(object_path(ota, sha), file)
+    lru = load_index(ota)
+    if sha in lru:
+        lru.remove(sha)
+
+
+def copy_file(src: str, dst: str, block_size: int):
+    """
+    复制文件，按文件系统块大小写入（生成器），每写入一个数据块让出一次
+
+    Args:
+        src: 源文件
+        dst: 目标文件
+        block_size: 缓冲区大小
+    """
+    buf = bytearray(block_size)
+    with open(src, "rb") as fi, open(dst, "wb") as fo:
+        while True:
+            n = fi.readinto(buf)
+            if not n:
+                break
+            fo.write(buf if n == len(buf) else memoryview(buf)[:n])
+            yield
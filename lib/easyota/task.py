@@ -0,0 +1,100 @@
+"""
+EasyOTA 任务引擎：任务期间切换网络的高性能模式，以及 start() / step() 的后台任务调度，只在检查或安装更新时加载
+"""
+import gc
+import time
+
+
+def transfer(task, network, sources):
+    """
+    在任务期间将网络切换到高性能模式，结束后恢复原来的设置，并记录下载的吞吐量和内存占用的峰值（生成器）
+
+    Args:
+        task: 任务（生成器）
+        network: 网络对象，需要提供 performance()，可以提供 record_throughput()
+        sources: 任务使用的 EasyOTA 实例，用于统计下载的字节数和时间
+
+    Returns:
+        任务的返回值
+    """
+    for ota in sources:
+        ota.transferred = [0, 0]
+        ota.peak_memory = None
+    gc.collect()
+    if network is None or not hasattr(network, "performance"):
+        if network is not None:
+            print("[WARN] EasyOTA: The network object has no performance(), power management is unchanged.")
+        return (yield from task)
+    with network.performance():
+        result = yield from task
+    size = sum(ota.transferred[0] for ota in sources)
+    ms = sum(ota.transferred[1] for ota in sources)
+    if size and ms and hasattr(network, "record_throughput"):
+        network.record_throughput(size, ms)
+    return result
+
+
+def run(owner, task, network, sources, roam: bool = False):
+    """
+    在任务期间设置当前使用的网络对象，并将网络切换到高性能模式，见 transfer()（生成器）
+
+    Args:
+        owner: EasyOTA 或 MultiOTA 实例
+        task: _fetch() 或 _update() 等生成器
+        network: 网络对象，默认为 owner.network
+        sources: 任务使用的 EasyOTA 实例
+        roam: 是否可以在下载前调用 network.roam()，只用于阻塞的 fetch() 和 update()
+
+    Returns:
+        任务的返回值
+    """
+    owner._network = network or owner.network
+    owner._roam = roam
+    try:
+        return (yield from transfer(task, owner._network, sources))
+    finally:
+        owner._network = None
+        owner._roam = False
+
+
+def start(owner, task, network, sources):
+    """
+    开始后台任务，结束未完成的任务，见 EasyOTA.start()
+
+    Args:
+        owner: EasyOTA 或 MultiOTA 实例
+        task: _fetch() 或 _update() 生成器
+        network: 网络对象，默认为 owner.network
+        sources: 任务使用的 EasyOTA 实例
+    """
+    if owner._task is not None:  # 结束未完成的任务，退出其中的 network.performance()
+        owner._task.close()
+    owner._task = run(owner, task, network, sources)
+    owner.result = None
+    owner.phase = "preparation"
+
+
+def step(owner, budget_ms: int) -> str:
+    """
+    推进后台任务，每次调用只执行约 budget_ms 毫秒的工作，见 EasyOTA.step()
+
+    Args:
+        owner: EasyOTA 或 MultiOTA 实例
+        budget_ms: 本次调用的时间预算（毫秒），至少执行一个工作单元
+
+    Returns:
+        当前阶段
+    """
+    if owner._task is None:
+        return owner.phase
+    deadline = time.ticks_add(time.ticks_ms(), budget_ms)
+    try:
+        while True:
+            next(owner._task)
+            if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                break
+    except StopIteration as e:
+        owner.result = e.args[0] if e.args else None
+        owner._task = None
+        owner.phase = "done"
+    return owner.phase
@@ -2,11 +2,10 @@
 from lib.easyota import EasyOTA
 from lib.easynetwork import Client
 
-# 连接网络
+# 连接网络（优先使用上一次的连接参数快速重连）
 client = Client()
-client.connect('ssid', 'password')
-while not client.isconnected():
-    pass
+if not client.connect_wait(15000, 'ssid', 'password'):
+    raise OSError("WLAN connection timeout")
 print("IP Address: ", client.ifconfig()[0])
 
 
@@ -23,7 +22,8 @@ def callback(msg, done, total):
 # 初始化实例
 eo = EasyOTA('funnygeeker', 'micropython-easyota', 'main',
              git_raw=EasyOTA.GITHUB_RAW, git_api=EasyOTA.GITHUB_API,
-             ignore=['/lib/easynetwork.py', '/lib/urequests.py', '/lib/easyota.py', '/main.py'],
+             ignore=['/lib/easynetwork.py', '/lib/urequests.py', '/lib/easyota', '/main.py',
+                     '/_easynetwork.json'],
              callback=callback)  # 更多使用方法详见注释，您可以用 AI 将注释翻译为您所使用的语言
 
 
@@ -0,0 +1,54 @@
+"""
+在设备上测量导入 EasyOTA 核心和各个引擎所需的时间和内存
+
+将 lib 目录上传到设备后运行（需要在导入 EasyOTA 之前运行，例如复位后直接运行本文件）：
+    mpremote run tools/measure_import.py
+
+Example output:
+    easyota            12345 us    4096 bytes
+    easyota.digest      2345 us     512 bytes
+    ...
+"""
+import gc
+import sys
+import time
+
+MODULES = ("easyota", "easyota.task", "easyota.digest", "easyota.net", "easyota.check", "easyota.store",
+           "easyota.install", "easyota.multi", "easyota.notify", "easyota.firmware")
+
+
+def measure(name: str) -> tuple:
+    """
+    测量导入单个模块所需的时间和内存
+
+    Args:
+        name: 模块名
+
+    Returns:
+        (导入时间（微秒）, 占用的内存（字节）)
+    """
+    gc.collect()
+    free = gc.mem_free()
+    start = time.ticks_us()
+    __import__(name)
+    used = time.ticks_diff(time.ticks_us(), start)
+    gc.collect()
+    return used, free - gc.mem_free()
+
+
+def main():
+    if "lib" not in sys.path and "/lib" not in sys.path:
+        sys.path.append("/lib")
+    total_time = total_mem = 0
+    for name in MODULES:
+        if name in sys.modules:
+            print("{:<18} already imported, reset the device and try again".format(name))
+            continue
+        used, mem = measure(name)
+        total_time += used
+        total_mem += mem
+        print("{:<18} {:>8} us {:>8} bytes".format(name, used, mem))
+    print("{:<18} {:>8} us {:>8} bytes".format("total", total_time, total_mem))
+
+
+main()
@@ -0,0 +1,96 @@
+"""
+在电脑上将存储库中的 .py 文件预编译为 .mpy 文件，供 EasyOTA 按设备的 .mpy 版本和架构选择安装
+
+生成的目录结构：
+    {src}/_mpy/{tag}/lib/xxx.mpy  ->  对应 {src}/lib/xxx.py
+
+tag 为 `{版本}.{子版本}`（只包含字节码，与架构无关），指定 --march 时为 `{版本}.{子版本}-{架构}`（可以包含原生代码）
+将生成的目录与源文件一起提交到存储库即可
+
+Example:
+    python tools/mpy_build.py .
+    python tools/mpy_build.py . --march xtensawin
+    python tools/mpy_build.py firmware --exclude main.py boot.py config.py
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+
+def mpy_version(mpy_cross: str) -> str:
+    """
+    获取 mpy-cross 生成的 .mpy 版本
+
+    Args:
+        mpy_cross: mpy-cross 可执行文件
+
+    Returns:
+        例如 '6.2'
+    """
+    output = subprocess.run([mpy_cross, "--version"], capture_output=True, text=True, check=True).stdout
+    match = re.search(r"mpy v(\d+)(?:\.(\d+))?", output)
+    if not match:
+        raise RuntimeError("Unknown mpy-cross version: {}".format(output.strip()))
+    return "{}.{}".format(match.group(1), match.group(2) or 0)
+
+
+def build(src: str, out: str, tag: str, mpy_cross: str, march: str = None, exclude: list = None) -> int:
+    """
+    预编译目录下的所有 .py 文件
+
+    Args:
+        src: 源文件目录（与 EasyOTA 的 remote_path 对应）
+        out: 预编译文件目录（与 EasyOTA 的 mpy_path 对应）
+        tag: .mpy 版本标签
+        mpy_cross: mpy-cross 可执行文件
+        march: 目标架构，不指定则只生成字节码
+        exclude: 不需要预编译的文件，以 src 为标准的相对路径
+
+    Returns:
+        预编译的文件数量
+    """
+    exclude = {e.strip("/") for e in exclude or []}
+    out = os.path.abspath(out)
+    count = 0
+    for root, dirs, files in os.walk(src):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and os.path.abspath(os.path.join(root, d)) != out]
+        for name in files:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, src).replace(os.sep, "/")
+            if not name.endswith(".py") or rel in exclude:
+                continue
+            target = os.path.join(out, tag, rel[:-3] + ".mpy")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            cmd = [mpy_cross, "-o", target]
+            if march:
+                cmd.append("-march={}".format(march))
+            cmd.append(path)
+            subprocess.run(cmd, check=True)
+            print("{} -> {}".format(rel, os.path.relpath(target, src)))
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile .py files to .mpy files for EasyOTA.")
+    parser.add_argument("src", help="source directory (EasyOTA remote_path)")
+    parser.add_argument("--out", help="output directory (EasyOTA mpy_path), default: {src}/_mpy")
+    parser.add_argument("--march", help="target architecture, e.g. xtensawin, armv7emsp, rv32imc")
+    parser.add_argument("--mpy-cross", default="mpy-cross", help="mpy-cross executable")
+    parser.add_argument("--exclude", nargs="*", default=["main.py", "boot.py"],
+                        help="files that must stay as .py, default: main.py boot.py")
+    args = parser.parse_args()
+
+    tag = mpy_version(args.mpy_cross)
+    if args.march:
+        tag = "{}-{}".format(tag, args.march)
+    out = args.out or os.path.join(args.src, "_mpy")
+    count = build(args.src, out, tag, args.mpy_cross, args.march, args.exclude)
+    print("{} files compiled to {}".format(count, os.path.join(out, tag)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+EasyOTA 新版本通知的参考服务器（CPython，只使用标准库），见 lib/easyota/notify.py
+
+服务器代替所有设备检查分支的最新提交，有新的提交时:
+    - 向局域网广播 UDP 数据报 "easyota {user}/{repo}/{branch} {sha}"
+    - 返回等待中的长轮询请求 GET /head?sources={user}/{repo}/{branch}@{sha},...&wait={秒}
+
+新的提交可以通过两种方式得知:
+    - 每隔 --interval 秒请求一次 Github API（使用 ETag，未变化时不消耗 API 配额）
+    - 推送时由 Github / Gitee 的 Webhook 或 CI 请求 POST /hook，可以使用 --secret 校验签名；
+      也可以直接提交 {"source": "{user}/{repo}/{branch}", "head": "{sha}"}
+
+Example:
+    python tools/notify_server.py --watch funnygeeker/micropython-easyota/main
+    python tools/notify_server.py --watch user/app/main --watch user/drivers/main --interval 0 --secret xxx
+"""
+import hmac
+import json
+import time
+import socket
+import hashlib
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GITHUB_HEAD = "https://api.github.com/repos/{user}/{repo}/commits/{branch}"
+MAX_WAIT = 300  # 长轮询最长的等待时间（秒）
+
+
+class Heads:
+    def __init__(self, udp_port: int, broadcast: str):
+        """
+        记录各个来源的最新提交，变化时通知设备
+
+        Args:
+            udp_port: UDP 广播端口，为 0 时不广播
+            broadcast: 广播地址
+        """
+        self.heads = {}  # {source: sha}
+        self.cond = threading.Condition()
+        self.udp_port = udp_port
+        self.broadcast = broadcast
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+    def set(self, source: str, sha: str):
+        """
+        更新来源的最新提交，有变化时广播并唤醒等待中的长轮询请求
+
+        Args:
+            source: "{user}/{repo}/{branch}"
+            sha: 最新提交的 SHA
+        """
+        with self.cond:
+            if self.heads.get(source) == sha:
+                return
+            self.heads[source] = sha
+            self.cond.notify_all()
+        print("{} {}".format(source, sha))
+        if self.udp_port:
+            message = "easyota {} {}".format(source, sha).encode()
+            for _ in range(3):  # UDP 可能丢包，重复发送几次
+                self.sock.sendto(message, (self.broadcast, self.udp_port))
+                time.sleep(0.2)
+
+    def wait(self, known: dict, timeout: float) -> dict:
+        """
+        等待任一来源的最新提交与设备已知的提交不同
+
+        Args:
+            known: {source: sha}，设备已知的提交
+            timeout: 最长的等待时间（秒）
+
+        Returns:
+            {source: sha}，这些来源当前的最新提交（未知的来源除外）
+        """
+        deadline = time.time() + timeout
+        with self.cond:
+            while True:
+                if any(source in self.heads and self.heads[source] != sha for source, sha in known.items()):
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            return {source: self.heads[source] for source in known if source in self.heads}
+
+
+def watch(heads: Heads, source: str, interval: int, token: str = None):
+    """
+    定期请求 Github API 获取分支的最新提交（线程）
+
+    Args:
+        heads: Heads 实例
+        source: "{user}/{repo}/{branch}"
+        interval: 请求间隔（秒）
+        token: Github 访问令牌，可以提高 API 配额
+    """
+    user, repo, branch = source.split("/", 2)
+    url = GITHUB_HEAD.format(user=user, repo=repo, branch=branch)
+    etag = None
+    while True:
+        request = urllib.request.Request(url, headers={"Accept": "application/vnd.github.sha",
+                                                       "User-Agent": "EasyOTA-notify"})
+        if etag:
+            request.add_header("If-None-Match", etag)  # 未变化时返回 304，不消耗配额
+        if token:
+            request.add_header("Authorization", "Bearer {}".format(token))
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                etag = response.headers.get("ETag")
+                heads.set(source, response.read().decode().strip())
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                print("[WARN] {}: Status Code - {}".format(source, e.code))
+        except OSError as e:
+            print("[WARN] {}: {}".format(source, e))
+        time.sleep(interval)
+
+
+def make_handler(heads: Heads, sources: list, secret: str = None):
+    """
+    创建 HTTP 请求处理类
+
+    Args:
+        heads: Heads 实例
+        sources: 允许的来源，为空时允许所有来源
+        secret: Webhook 的密钥
+
+    Returns:
+        BaseHTTPRequestHandler 的子类
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, data=None):
+            body = json.dumps(data if data is not None else {}).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/head":
+                return self._reply(404)
+            query = parse_qs(url.query)
+            known = {}
+            for item in ",".join(query.get("sources", [])).split(","):
+                if item:
+                    source, _, sha = item.partition("@")
+                    known[source] = sha
+            try:
+                wait = min(float(query.get("wait", ["0"])[0]), MAX_WAIT)
+            except ValueError:
+                return self._reply(400)
+            self._reply(200, heads.wait(known, wait))
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/hook":
+                return self._reply(404)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if secret and not self._verify(body):
+                return self._reply(403)
+            try:
+                data = json.loads(body or b"{}")
+            except ValueError:
+                return self._reply(400)
+            if "source" in data:  # {"source": "{user}/{repo}/{branch}", "head": "{sha}"}
+                source, sha = data["source"], data.get("head")
+            else:  # Github / Gitee push 事件
+                ref = data.get("ref", "")
+                if not ref.startswith("refs/heads/"):
+                    return self._reply(202)
+                source = "{}/{}".format(data.get("repository", {}).get("full_name", ""), ref[len("refs/heads/"):])
+                sha = data.get("after")
+            if not sha or (sources and source not in sources):
+                return self._reply(202)
+            heads.set(source, sha)
+            self._reply(200, {source: sha})
+
+        def _verify(self, body: bytes) -> bool:
+            signature = self.headers.get("X-Hub-Signature-256", "")  # Github
+            if signature:
+                digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+                return hmac.compare_digest(signature, "sha256=" + digest)
+            return hmac.compare_digest(self.headers.get("X-Gitee-Token", ""), secret)  # Gitee（密码模式）
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notify EasyOTA devices about new commits.")
+    parser.add_argument("--watch", action="append", default=[], metavar="USER/REPO/BRANCH",
+                        help="source to announce, may be given several times")
+    parser.add_argument("--interval", type=int, default=60,
+                        help="seconds between Github API requests, 0 to rely on webhooks only")
+    parser.add_argument("--token", help="Github access token for a higher API quota")
+    parser.add_argument("--secret", help="webhook secret (Github signature or Gitee password)")
+    parser.add_argument("--host", default="0.0.0.0", help="HTTP listen address")
+    parser.add_argument("--http-port", type=int, default=8042, help="HTTP port for long-poll and webhooks")
+    parser.add_argument("--udp-port", type=int, default=42042, help="UDP broadcast port, 0 to disable")
+    parser.add_argument("--broadcast", default="255.255.255.255", help="UDP broadcast address")
+    args = parser.parse_args()
+
+    heads = Heads(args.udp_port, args.broadcast)
+    if args.interval > 0:
+        for source in args.watch:
+            threading.Thread(target=watch, args=(heads, source, args.interval, args.token), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.http_port), make_handler(heads, args.watch, args.secret))
+    server.daemon_threads = True
+    print("Listening on http://{}:{}/head".format(args.host, args.http_port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()